@@ -0,0 +1,73 @@
+import argparse
+
+import psycopg
+
+from config import DATABASE_URL, TABLES
+from notify.queries import (
+    RUN_META,
+    NET_WORTH_FOR_RUN,
+    TODAY_TOTALS_FOR_RUN,
+    WTD_TOTALS,
+    MTD_TOTALS,
+    YTD_TOTALS,
+    POSTED_TRANSACTIONS_FOR_RUN,
+    BALANCES_WITH_PREV_FOR_RUN,
+    NET_WORTH_SERIES,
+    NET_WORTH_TREND,
+    ACCOUNT_BALANCE_TRENDS,
+)
+
+
+def report_queries(run_id):
+    return [
+        ("run_meta", RUN_META, (run_id,)),
+        ("today_totals", TODAY_TOTALS_FOR_RUN, (run_id,)),
+        ("wtd_totals", WTD_TOTALS, ()),
+        ("mtd_totals", MTD_TOTALS, ()),
+        ("ytd_totals", YTD_TOTALS, ()),
+        ("net_worth", NET_WORTH_FOR_RUN, (run_id, run_id)),
+        ("balances_with_prev", BALANCES_WITH_PREV_FOR_RUN, (run_id,)),
+        ("posted_transactions", POSTED_TRANSACTIONS_FOR_RUN, (run_id,)),
+        ("net_worth_series_365d", NET_WORTH_SERIES, (365,)),
+        ("net_worth_trend", NET_WORTH_TREND, ()),
+        ("account_balance_trends", ACCOUNT_BALANCE_TRENDS, ()),
+    ]
+
+
+def explain(conn, sql, params, analyze):
+    options = "analyze, buffers, costs" if analyze else "costs"
+    with conn.cursor() as cur:
+        cur.execute(f"explain ({options}) {sql.strip().rstrip(';')}", params)
+        return "\n".join(row[0] for row in cur.fetchall())
+
+
+def latest_run_id(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"select max(id) from {TABLES['runs']} where run_type = 'daily_sync' and status = 'success';")
+        return cur.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print EXPLAIN plans for the daily report queries.")
+    parser.add_argument("--run-id", type=int, help="run to explain against (default: latest successful daily_sync)")
+    parser.add_argument("--analyze", action="store_true", help="execute the queries (EXPLAIN ANALYZE, BUFFERS)")
+    parser.add_argument("--out", help="also write the plans to this file, e.g. before/after a migration")
+    args = parser.parse_args()
+    conn = psycopg.connect(DATABASE_URL, sslmode="require")
+    try:
+        run_id = args.run_id or latest_run_id(conn)
+        sections = []
+        for label, sql, params in report_queries(run_id):
+            sections.append(f"== {label} (run_id={run_id})\n{explain(conn, sql, params, args.analyze)}\n")
+        output = "\n".join(sections)
+        print(output)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(output)
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import random
+import uuid
+from datetime import date, timedelta
+
+from db.repos.accounts import upsert_account
+from db.repos.items import upsert_item
+from db.repos.runs import create_run
+
+MERCHANTS = ["Coffee Shop", "Grocer", "Gas Station", "Airline", "Bookstore", "Pharmacy", "Streaming"]
+
+
+def scratch_account(conn):
+    suffix = uuid.uuid4().hex[:12]
+    plaid_item_pk = upsert_item(
+        conn,
+        label=f"bench-{suffix}",
+        institution_name="Bench",
+        institution_id="ins_bench",
+        item_id=f"bench-item-{suffix}",
+        access_token_plaintext="bench",
+        transactions_enabled=False,
+        balances_enabled=False,
+    )
+    account_id = f"bench-acct-{suffix}"
+    account_pk = upsert_account(
+        conn=conn,
+        plaid_item_pk=plaid_item_pk,
+        account_id=account_id,
+        name="Bench Checking",
+        account_type="depository",
+        subtype="checking",
+        iso_currency_code="USD",
+    )
+    return plaid_item_pk, account_id, account_pk
+
+
+def scratch_run(conn):
+    return create_run(conn, run_type="bench")
+
+
+def synthetic_transactions(n, account_id, prefix="tx", seed=7):
+    rng = random.Random(seed)
+    today = date.today()
+    txs = []
+    for i in range(n):
+        merchant = rng.choice(MERCHANTS)
+        d = today - timedelta(days=rng.randint(0, 700))
+        txs.append(
+            {
+                "transaction_id": f"{prefix}-{uuid.uuid4().hex}",
+                "account_id": account_id,
+                "amount": round(rng.uniform(-500, 500), 2),
+                "iso_currency_code": "USD",
+                "date": d.isoformat(),
+                "authorized_date": d.isoformat(),
+                "pending": False,
+                "pending_transaction_id": None,
+                "name": f"{merchant.upper()} #{rng.randint(100, 999)}",
+                "merchant_name": merchant,
+                "category_id": "13005000",
+                "category": ["Food and Drink", "Restaurants"],
+                "personal_finance_category": {"primary": "FOOD_AND_DRINK", "detailed": "FOOD_AND_DRINK_COFFEE"},
+                "payment_channel": "in store",
+                "transaction_type": "place",
+                "datetime": None,
+                "authorized_datetime": None,
+                "location": {"city": "Springfield", "region": "IL", "country": "US"},
+                "counterparties": [{"name": merchant, "type": "merchant"}],
+            }
+        )
+    return txs
+
+
+def page(txs, size):
+    for i in range(0, len(txs), size):
+        yield txs[i : i + size]
@@ -0,0 +1,61 @@
+import argparse
+import json
+import time
+
+from plaid.model.transactions_sync_response import TransactionsSyncResponse
+
+from db.db import db_conn
+from db.repos.items import list_items_for_transactions, get_access_token
+from ingest.ingest_plaid import to_plain
+from plaid_src.client import get_plaid_client
+from plaid_src.raw_client import RawPlaidClient
+
+
+class RecordedResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+def decode_sdk(api_client, body):
+    resp = api_client.deserialize(RecordedResponse(body), (TransactionsSyncResponse,), True)
+    plain = to_plain(resp)
+    return [to_plain(tx) for tx in plain.get("added", [])]
+
+
+def decode_raw(body):
+    return json.loads(body).get("added", [])
+
+
+def per_page_ms(fn, repeats, *args):
+    started = time.perf_counter()
+    for _ in range(repeats):
+        fn(*args)
+    return (time.perf_counter() - started) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare SDK model decoding with raw JSON decoding of a sync page.")
+    parser.add_argument("--count", type=int, default=500, help="transactions_sync page size to request")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    with db_conn() as conn:
+        items = list_items_for_transactions(conn)
+        if not items:
+            raise RuntimeError("No transactions-enabled items to sample a sync page from")
+        access_token = get_access_token(conn, items[0][0])
+    body = RawPlaidClient().request(
+        "/transactions/sync",
+        {"access_token": access_token, "count": args.count},
+    )
+    rows = len(decode_raw(body))
+    api_client = get_plaid_client().api_client
+    sdk_ms = per_page_ms(decode_sdk, args.repeats, api_client, body)
+    raw_ms = per_page_ms(decode_raw, args.repeats, body)
+    print(f"page_bytes={len(body)} rows={rows} repeats={args.repeats}")
+    print(f"sdk_models  {sdk_ms:8.2f} ms/page")
+    print(f"raw_json    {raw_ms:8.2f} ms/page")
+    print(f"speedup={sdk_ms / raw_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
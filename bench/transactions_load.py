@@ -0,0 +1,52 @@
+import argparse
+import time
+
+import psycopg
+
+from config import DATABASE_URL
+from db.repos.transactions import upsert_transaction, bulk_upsert_transactions
+from bench.fixtures import scratch_account, scratch_run, synthetic_transactions, page
+
+
+def load_per_row(conn, run_id, account_pk, txs, page_size):
+    for chunk in page(txs, page_size):
+        for tx in chunk:
+            upsert_transaction(conn, run_id, account_pk, tx, sync_status="added")
+
+
+def load_bulk(conn, run_id, account_pk, txs, page_size):
+    for chunk in page(txs, page_size):
+        bulk_upsert_transactions(conn, run_id, [(account_pk, tx, "added") for tx in chunk])
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and COPY-based transaction writes.")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+    conn = psycopg.connect(DATABASE_URL, sslmode="require")
+    try:
+        run_id = scratch_run(conn)
+        _, account_id, account_pk = scratch_account(conn)
+        results = []
+        for label, loader in (("per_row", load_per_row), ("bulk_copy", load_bulk)):
+            txs = synthetic_transactions(args.rows, account_id, prefix=label)
+            elapsed = timed(loader, conn, run_id, account_pk, txs, args.page_size)
+            results.append((label, elapsed))
+        for label, elapsed in results:
+            print(f"{label:<10} rows={args.rows} elapsed={elapsed:.3f}s rows_per_sec={args.rows / elapsed:,.0f}")
+        baseline = results[0][1]
+        print(f"speedup={baseline / results[1][1]:.1f}x")
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
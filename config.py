@@ -5,6 +5,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_ENABLED = os.getenv("DB_POOL_ENABLED", "true").lower() == "true"
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", "300"))
+DB_POOL_MAX_LIFETIME_SECONDS = float(os.getenv("DB_POOL_MAX_LIFETIME_SECONDS", "3600"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
 
 TABLES = {
     "plaid_items": os.getenv("PLAID_ITEMS_TABLE", "plaid_items"),
@@ -16,8 +22,21 @@ TABLES = {
     "notifications": os.getenv("NOTIFICATIONS_TABLE", "notifications"),
     "hosted_link_sessions": os.getenv("HOSTED_LINK_SESSIONS_TABLE", "hosted_link_sessions"),
     "plaid_webhook_events": os.getenv("PLAID_WEBHOOK_EVENTS_TABLE", "plaid_webhook_events"),
+    "sync_jobs": os.getenv("SYNC_JOBS_TABLE", "sync_jobs"),
+    "raw_archive": os.getenv("RAW_ARCHIVE_TABLE", "raw_archive"),
+    "transactions_backfill": os.getenv("TRANSACTIONS_BACKFILL_TABLE", "transactions_backfill"),
+    "schema_migrations": os.getenv("SCHEMA_MIGRATIONS_TABLE", "schema_migrations"),
+    "daily_rollups": os.getenv("DAILY_ROLLUPS_TABLE", "daily_rollups"),
+    "balance_history": os.getenv("BALANCE_HISTORY_TABLE", "balance_history"),
+    "net_worth_history": os.getenv("NET_WORTH_HISTORY_TABLE", "net_worth_history"),
+    "run_summaries": os.getenv("RUN_SUMMARIES_TABLE", "run_summaries"),
+    "run_summary_transactions": os.getenv("RUN_SUMMARY_TRANSACTIONS_TABLE", "run_summary_transactions"),
+    "pdf_cache": os.getenv("PDF_CACHE_TABLE", "pdf_cache"),
 }
 
+DB_PARTITIONED = os.getenv("DB_PARTITIONED", "false").lower() == "true"
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "3"))
+
 def table(name):
     return TABLES[name]
 
@@ -81,12 +100,50 @@ PLAID_HOST = PLAID_HOSTS[PLAID_ENV]
 
 PLAID_REDIRECT_URI = os.getenv("PLAID_REDIRECT_URI")
 
+PLAID_RAW_CLIENT = os.getenv("PLAID_RAW_CLIENT", "true").lower() == "true"
+PLAID_HTTP_POOL_SIZE = int(os.getenv("PLAID_HTTP_POOL_SIZE", "10"))
+PLAID_HTTP_TIMEOUT_SECONDS = float(os.getenv("PLAID_HTTP_TIMEOUT_SECONDS", "60"))
+PLAID_SCHEDULER_ENABLED = os.getenv("PLAID_SCHEDULER_ENABLED", "true").lower() == "true"
+PLAID_SYNC_CLIENT_PER_MINUTE = float(os.getenv("PLAID_SYNC_CLIENT_PER_MINUTE", "2500"))
+PLAID_SYNC_ITEM_PER_MINUTE = float(os.getenv("PLAID_SYNC_ITEM_PER_MINUTE", "50"))
+PLAID_BALANCE_CLIENT_PER_MINUTE = float(os.getenv("PLAID_BALANCE_CLIENT_PER_MINUTE", "1200"))
+PLAID_BALANCE_ITEM_PER_MINUTE = float(os.getenv("PLAID_BALANCE_ITEM_PER_MINUTE", "5"))
+PLAID_RETRY_MAX_ATTEMPTS = int(os.getenv("PLAID_RETRY_MAX_ATTEMPTS", "6"))
+PLAID_RETRY_BASE_SECONDS = float(os.getenv("PLAID_RETRY_BASE_SECONDS", "1"))
+PLAID_RETRY_MAX_SECONDS = float(os.getenv("PLAID_RETRY_MAX_SECONDS", "60"))
+PLAID_RETRY_BUDGET_RATIO = float(os.getenv("PLAID_RETRY_BUDGET_RATIO", "0.2"))
+PLAID_RETRY_BUDGET_MIN = int(os.getenv("PLAID_RETRY_BUDGET_MIN", "20"))
+
 
 INGEST_TRANSACTIONS_DEFAULT = True
 INGEST_BALANCES_DEFAULT = True
+INGEST_BULK_WRITES = os.getenv("INGEST_BULK_WRITES", "true").lower() == "true"
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "1"))
+INGEST_PREFETCH_PAGES = int(os.getenv("INGEST_PREFETCH_PAGES", "1"))
+INGEST_CHECKPOINT_PAGES = os.getenv("INGEST_CHECKPOINT_PAGES", "false").lower() == "true"
+INGEST_TRANSACTIONS_MODE = os.getenv("INGEST_TRANSACTIONS_MODE", "all")
+INGEST_FULL_SWEEP_HOURS = int(os.getenv("INGEST_FULL_SWEEP_HOURS")) if os.getenv("INGEST_FULL_SWEEP_HOURS") else None
+INGEST_BACKFILL_BULK = os.getenv("INGEST_BACKFILL_BULK", "true").lower() == "true"
+INGEST_OVERLAP_PHASES = os.getenv("INGEST_OVERLAP_PHASES", "false").lower() == "true"
+INGEST_ASYNC = os.getenv("INGEST_ASYNC", "false").lower() == "true"
+INGEST_ASYNC_CONCURRENCY = int(os.getenv("INGEST_ASYNC_CONCURRENCY", "20"))
+
+RAW_ARCHIVE_ENABLED = os.getenv("RAW_ARCHIVE_ENABLED", "true").lower() == "true"
+RAW_ARCHIVE_COMPRESSION_LEVEL = int(os.getenv("RAW_ARCHIVE_COMPRESSION_LEVEL", "6"))
+
+
+SYNC_JOB_POLL_SECONDS = float(os.getenv("SYNC_JOB_POLL_SECONDS", "5"))
+SYNC_JOB_LEASE_SECONDS = int(os.getenv("SYNC_JOB_LEASE_SECONDS", "900"))
+SYNC_JOB_MAX_ATTEMPTS = int(os.getenv("SYNC_JOB_MAX_ATTEMPTS", "5"))
+SYNC_JOB_BACKOFF_SECONDS = float(os.getenv("SYNC_JOB_BACKOFF_SECONDS", "30"))
+SYNC_JOB_BACKOFF_MAX_SECONDS = float(os.getenv("SYNC_JOB_BACKOFF_MAX_SECONDS", "3600"))
 
 
 NOTIFICATIONS_ENABLED = os.getenv("NOTIFICATIONS_ENABLED", "true").lower() == "true"
 DAILY_DIGEST_HOUR = int(os.getenv("DAILY_DIGEST_HOUR", "9"))
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "true").lower() == "true"
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PDF_LARGE_REPORT_ROWS = int(os.getenv("PDF_LARGE_REPORT_ROWS", "2000"))
+PDF_CHUNK_ROWS = int(os.getenv("PDF_CHUNK_ROWS", "60"))
 TIMEZONE = os.getenv("TIMEZONE", "America/New_York")
 TRANSACTIONS_START_DATE = os.getenv("TRANSACTIONS_START_DATE")
\ No newline at end of file
@@ -0,0 +1,72 @@
+import argparse
+import psycopg
+from config import DATABASE_URL, TABLES
+from db.repos.raw_archive import archive_payloads
+
+ARCHIVED_TABLES = ("transactions", "accounts", "balance_snapshots", "plaid_webhook_events")
+
+
+def archive_batch(conn, table_key, batch_size):
+    table = TABLES[table_key]
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            select id, raw
+            from {table}
+            where raw is not null
+              and raw_ref is null
+            order by id
+            limit %s
+            for update skip locked;
+            """,
+            (batch_size,),
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return 0
+    refs = archive_payloads(conn, [raw for _, raw in rows])
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            update {table} t
+            set raw_ref = v.raw_ref,
+                raw = null
+            from unnest(%s::bigint[], %s::bigint[]) as v(id, raw_ref)
+            where t.id = v.id;
+            """,
+            ([row_id for row_id, _ in rows], refs),
+        )
+    return len(rows)
+
+
+def archive_table(conn, table_key, batch_size):
+    total = 0
+    while True:
+        moved = archive_batch(conn, table_key, batch_size)
+        conn.commit()
+        if not moved:
+            return total
+        total += moved
+        print(f"{TABLES[table_key]}: archived {total} rows")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline raw payloads into the compressed raw archive.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--vacuum", action="store_true", help="vacuum each table after its raw payloads are moved")
+    args = parser.parse_args()
+    with psycopg.connect(DATABASE_URL) as conn:
+        for table_key in ARCHIVED_TABLES:
+            total = archive_table(conn, table_key, args.batch_size)
+            print(f"{TABLES[table_key]}: done, {total} rows archived")
+        if args.vacuum:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                for table_key in ARCHIVED_TABLES:
+                    cur.execute(f"vacuum (analyze) {TABLES[table_key]};")
+                    print(f"{TABLES[table_key]}: vacuumed")
+    print("Raw archive backfill complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,81 @@
+import atexit
+import threading
 import psycopg
-from contextlib import contextmanager
-from config import DATABASE_URL
+from contextlib import asynccontextmanager, contextmanager
+from config import (
+    DATABASE_URL,
+    DB_POOL_ENABLED,
+    DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MAX_IDLE_SECONDS,
+    DB_POOL_MAX_LIFETIME_SECONDS,
+    DB_POOL_TIMEOUT_SECONDS,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from psycopg_pool import ConnectionPool
+
+                _pool = ConnectionPool(
+                    DATABASE_URL,
+                    min_size=DB_POOL_MIN_SIZE,
+                    max_size=max(DB_POOL_MAX_SIZE, DB_POOL_MIN_SIZE),
+                    max_idle=DB_POOL_MAX_IDLE_SECONDS,
+                    max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+                    timeout=DB_POOL_TIMEOUT_SECONDS,
+                    kwargs={"sslmode": "require"},
+                    check=ConnectionPool.check_connection,
+                    name="finance",
+                    open=True,
+                )
+                atexit.register(close_pool)
+    return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@asynccontextmanager
+async def async_db_pool(max_size=None):
+    from psycopg_pool import AsyncConnectionPool
+
+    pool = AsyncConnectionPool(
+        DATABASE_URL,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=max(max_size or DB_POOL_MAX_SIZE, DB_POOL_MIN_SIZE),
+        max_idle=DB_POOL_MAX_IDLE_SECONDS,
+        max_lifetime=DB_POOL_MAX_LIFETIME_SECONDS,
+        timeout=DB_POOL_TIMEOUT_SECONDS,
+        kwargs={"sslmode": "require"},
+        check=AsyncConnectionPool.check_connection,
+        name="finance-async",
+        open=False,
+    )
+    await pool.open()
+    try:
+        yield pool
+    finally:
+        await pool.close()
+
 
 @contextmanager
 def db_conn():
+    if DB_POOL_ENABLED:
+        with get_pool().connection() as conn:
+            yield conn
+        return
     conn = psycopg.connect(DATABASE_URL, sslmode="require")
     try:
         yield conn
@@ -12,4 +84,4 @@ def db_conn():
         conn.rollback()
         raise
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
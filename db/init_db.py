@@ -1,12 +1,11 @@
 from string import Template
 import psycopg
-from config import DATABASE_URL, TABLES
+from config import DATABASE_URL, TABLES, DB_PARTITIONED
+from db.partitioning import PARTITION_SPECS, convert_to_partitioned, maintain_partitions
 
 
-def main():
-    with open("db/schema.sql", "r") as f:
-        raw_sql = f.read()
-    sql = Template(raw_sql).safe_substitute({
+def template_values():
+    return {
         "PLAID_ITEMS_TABLE": TABLES["plaid_items"],
         "BALANCE_SNAPSHOTS_TABLE": TABLES["balance_snapshots"],
         "RUNS_TABLE": TABLES["runs"],
@@ -16,13 +15,43 @@ def main():
         "NOTIFICATIONS_TABLE": TABLES["notifications"],
         "HOSTED_LINK_SESSIONS_TABLE": TABLES["hosted_link_sessions"],
         "PLAID_WEBHOOK_EVENTS_TABLE": TABLES["plaid_webhook_events"],
-    })
+        "SYNC_JOBS_TABLE": TABLES["sync_jobs"],
+        "RAW_ARCHIVE_TABLE": TABLES["raw_archive"],
+        "TRANSACTIONS_BACKFILL_TABLE": TABLES["transactions_backfill"],
+        "SCHEMA_MIGRATIONS_TABLE": TABLES["schema_migrations"],
+        "DAILY_ROLLUPS_TABLE": TABLES["daily_rollups"],
+        "BALANCE_HISTORY_TABLE": TABLES["balance_history"],
+        "NET_WORTH_HISTORY_TABLE": TABLES["net_worth_history"],
+        "RUN_SUMMARIES_TABLE": TABLES["run_summaries"],
+        "RUN_SUMMARY_TRANSACTIONS_TABLE": TABLES["run_summary_transactions"],
+        "PDF_CACHE_TABLE": TABLES["pdf_cache"],
+    }
+
+
+def render_sql(raw_sql):
+    return Template(raw_sql).safe_substitute(template_values())
+
+
+def main():
+    from db.migrate import apply_migrations
+
+    with open("db/schema.sql", "r") as f:
+        raw_sql = f.read()
+    sql = render_sql(raw_sql)
     with psycopg.connect(DATABASE_URL) as conn:
         with conn.cursor() as cur:
             cur.execute(sql)
         conn.commit()
+        if DB_PARTITIONED:
+            for table_key in PARTITION_SPECS:
+                if convert_to_partitioned(conn, table_key):
+                    print(f"{TABLES[table_key]}: converted to a partitioned table")
+            maintain_partitions(conn)
+            conn.commit()
+        for version in apply_migrations(conn):
+            print(f"Applied migration {version}")
     print("Schema applied successfully.")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,195 @@
+import argparse
+import hashlib
+import importlib.util
+import os
+import time
+import psycopg
+from config import DATABASE_URL, TABLES
+from db.init_db import render_sql
+
+SCHEMA_MIGRATIONS_TABLE = TABLES["schema_migrations"]
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_LOCK_KEY = 7301946285
+
+
+def ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            create table if not exists {SCHEMA_MIGRATIONS_TABLE} (
+              version text primary key,
+              name text not null,
+              checksum text not null,
+              applied_at timestamptz not null default now(),
+              duration_ms integer
+            );
+            """
+        )
+        cur.execute(f"alter table {SCHEMA_MIGRATIONS_TABLE} enable row level security;")
+        cur.execute(f"revoke all on {SCHEMA_MIGRATIONS_TABLE} from anon, authenticated;")
+        cur.execute(f"grant select, insert, update, delete on {SCHEMA_MIGRATIONS_TABLE} to service_role;")
+        cur.execute(f"drop policy if exists service_role_all on {SCHEMA_MIGRATIONS_TABLE};")
+        cur.execute(
+            f"create policy service_role_all on {SCHEMA_MIGRATIONS_TABLE} "
+            "for all to service_role using (true) with check (true);"
+        )
+    conn.commit()
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(filename)
+        if ext not in (".sql", ".py") or "_" not in stem or not stem.split("_", 1)[0].isdigit():
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        version, name = stem.split("_", 1)
+        migrations.append({"version": version, "name": name, "path": path, "kind": ext[1:], "checksum": checksum})
+    versions = [m["version"] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def applied_migrations(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"select version, checksum from {SCHEMA_MIGRATIONS_TABLE} order by version;")
+        return dict(cur.fetchall())
+
+
+def load_module(migration):
+    spec = importlib.util.spec_from_file_location(f"migration_{migration['version']}", migration["path"])
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_migration(conn, migration):
+    if migration["kind"] == "sql":
+        with open(migration["path"], "r") as f:
+            sql = render_sql(f.read())
+        with conn.cursor() as cur:
+            cur.execute(sql)
+        return
+    module = load_module(migration)
+    if getattr(module, "TRANSACTIONAL", True):
+        module.upgrade(conn)
+        return
+    conn.commit()
+    conn.autocommit = True
+    try:
+        module.upgrade(conn)
+    finally:
+        conn.autocommit = False
+
+
+def record_migration(conn, migration, duration_ms):
+    with conn.cursor() as cur:
+        cur.execute(
+            f"""
+            insert into {SCHEMA_MIGRATIONS_TABLE} (version, name, checksum, duration_ms)
+            values (%s, %s, %s, %s);
+            """,
+            (migration["version"], migration["name"], migration["checksum"], duration_ms),
+        )
+
+
+def apply_migrations(conn, target=None):
+    ensure_migrations_table(conn)
+    with conn.cursor() as cur:
+        cur.execute("select pg_advisory_lock(%s);", (MIGRATION_LOCK_KEY,))
+    conn.commit()
+    applied = []
+    try:
+        done = applied_migrations(conn)
+        for migration in discover_migrations():
+            if target is not None and migration["version"] > target:
+                break
+            if migration["version"] in done:
+                if done[migration["version"]] != migration["checksum"]:
+                    print(f"warning: migration {migration['version']} changed after it was applied")
+                continue
+            started = time.monotonic()
+            try:
+                run_migration(conn, migration)
+                record_migration(conn, migration, int((time.monotonic() - started) * 1000))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            applied.append(migration["version"])
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("select pg_advisory_unlock(%s);", (MIGRATION_LOCK_KEY,))
+        conn.commit()
+    return applied
+
+
+def index_state(conn, name):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            select i.indisvalid
+            from pg_index i
+            where i.indexrelid = to_regclass(%s);
+            """,
+            (name,),
+        )
+        row = cur.fetchone()
+        return None if row is None else row[0]
+
+
+def create_index_concurrently(conn, name, table, columns, where=None):
+    from db.partitioning import is_partitioned, list_partitions
+
+    predicate = f" where {where}" if where else ""
+    if not is_partitioned(conn, table):
+        with conn.cursor() as cur:
+            if index_state(conn, name) is False:
+                cur.execute(f"drop index concurrently if exists {name};")
+            cur.execute(f"create index concurrently if not exists {name} on {table} ({columns}){predicate};")
+        return
+    with conn.cursor() as cur:
+        cur.execute(f"create index if not exists {name} on only {table} ({columns}){predicate};")
+        for partition in list_partitions(conn, table):
+            partition_index = f"{partition}_{name}"[:63]
+            if index_state(conn, partition_index) is False:
+                cur.execute(f"drop index concurrently if exists {partition_index};")
+            cur.execute(
+                f"create index concurrently if not exists {partition_index} on {partition} ({columns}){predicate};"
+            )
+            cur.execute(
+                """
+                select exists (
+                  select 1 from pg_inherits
+                  where inhrelid = to_regclass(%s)
+                    and inhparent = to_regclass(%s)
+                );
+                """,
+                (partition_index, name),
+            )
+            if not cur.fetchone()[0]:
+                cur.execute(f"alter index {name} attach partition {partition_index};")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations.")
+    parser.add_argument("--status", action="store_true", help="list migrations and whether they are applied")
+    parser.add_argument("--target", help="apply migrations up to and including this version")
+    args = parser.parse_args()
+    with psycopg.connect(DATABASE_URL) as conn:
+        if args.status:
+            ensure_migrations_table(conn)
+            done = applied_migrations(conn)
+            for migration in discover_migrations():
+                state = "applied" if migration["version"] in done else "pending"
+                print(f"{migration['version']} {migration['name']}: {state}")
+            return
+        applied = apply_migrations(conn, target=args.target)
+    print(f"Applied {len(applied)} migration(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from config import TABLES
+from db.migrate import create_index_concurrently
+
+TRANSACTIONAL = False
+
+TRANSACTIONS_TABLE = TABLES["transactions"]
+BALANCE_SNAPSHOTS_TABLE = TABLES["balance_snapshots"]
+RUNS_TABLE = TABLES["runs"]
+
+
+def upgrade(conn):
+    create_index_concurrently(
+        conn,
+        f"idx_{TRANSACTIONS_TABLE}_last_seen_run",
+        TRANSACTIONS_TABLE,
+        "last_seen_run_id",
+        where="removed = false",
+    )
+    create_index_concurrently(
+        conn,
+        f"idx_{TRANSACTIONS_TABLE}_date_live",
+        TRANSACTIONS_TABLE,
+        "date, account_pk",
+        where="removed = false",
+    )
+    create_index_concurrently(conn, f"idx_{TRANSACTIONS_TABLE}_account_pk", TRANSACTIONS_TABLE, "account_pk")
+    create_index_concurrently(
+        conn, f"idx_{BALANCE_SNAPSHOTS_TABLE}_account_pk", BALANCE_SNAPSHOTS_TABLE, "account_pk"
+    )
+    create_index_concurrently(
+        conn, f"idx_{RUNS_TABLE}_env_type_status", RUNS_TABLE, "env, run_type, status, id"
+    )
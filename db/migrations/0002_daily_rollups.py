@@ -0,0 +1,9 @@
+from db.repos.rollups import CREATE_ROLLUPS_SQL, install_rollup_triggers, rebuild_rollups
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_ROLLUPS_SQL)
+    install_rollup_triggers(conn)
+    rows = rebuild_rollups(conn)
+    print(f"daily_rollups: backfilled {rows} rows")
@@ -0,0 +1,6 @@
+from db.repos.summaries import CREATE_RUN_SUMMARIES_SQL
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_RUN_SUMMARIES_SQL)
@@ -0,0 +1,6 @@
+from db.repos.pdf_cache import CREATE_PDF_CACHE_SQL
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_PDF_CACHE_SQL)
@@ -0,0 +1,8 @@
+from db.repos.history import CREATE_HISTORY_SQL, rebuild_history
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_HISTORY_SQL)
+    runs = rebuild_history(conn)
+    print(f"balance_history: rebuilt from {runs} runs")
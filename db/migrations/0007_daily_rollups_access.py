@@ -0,0 +1,6 @@
+from db.repos.rollups import CREATE_ROLLUPS_SQL
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_ROLLUPS_SQL)
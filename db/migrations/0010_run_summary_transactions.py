@@ -0,0 +1,7 @@
+from db.repos.summaries import CREATE_RUN_SUMMARIES_SQL, SPLIT_EMBEDDED_TRANSACTIONS_SQL
+
+
+def upgrade(conn):
+    with conn.cursor() as cur:
+        cur.execute(CREATE_RUN_SUMMARIES_SQL)
+        cur.execute(SPLIT_EMBEDDED_TRANSACTIONS_SQL)
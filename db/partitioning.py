@@ -0,0 +1,253 @@
+import argparse
+import re
+from datetime import date, datetime, timezone
+import psycopg
+from config import DATABASE_URL, TABLES, PARTITION_MONTHS_AHEAD
+from db.repos.rollups import rollups_installed, install_rollup_triggers
+
+PARTITION_SPECS = {
+    "transactions": {"key": "date", "key_type": "date"},
+    "balance_snapshots": {"key": "snapshot_at", "key_type": "timestamptz"},
+}
+
+PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def partitioned_constraints(table_key):
+    table = TABLES[table_key]
+    runs = TABLES["runs"]
+    accounts = TABLES["accounts"]
+    raw_archive = TABLES["raw_archive"]
+    if table_key == "transactions":
+        return [
+            f"alter table {table} add constraint {table}_id_date_key unique (id, date);",
+            f"""alter table {table} add constraint transactions_account_fk
+              foreign key (account_pk) references {accounts}(id) on delete cascade;""",
+            f"""alter table {table} add constraint transactions_first_seen_run_fk
+              foreign key (first_seen_run_id) references {runs}(id);""",
+            f"""alter table {table} add constraint transactions_last_seen_run_fk
+              foreign key (last_seen_run_id) references {runs}(id);""",
+            f"""alter table {table} add constraint transactions_raw_ref_fk
+              foreign key (raw_ref) references {raw_archive}(id);""",
+            f"create index if not exists idx_{table}_transaction_id on {table} (transaction_id);",
+        ]
+    return [
+        f"alter table {table} add constraint {table}_pkey primary key (id, snapshot_at);",
+        f"""alter table {table} add constraint balance_snapshots_run_fk
+          foreign key (run_id) references {runs}(id) on delete cascade;""",
+        f"""alter table {table} add constraint balance_snapshots_account_fk
+          foreign key (account_pk) references {accounts}(id) on delete cascade;""",
+        f"""alter table {table} add constraint balance_snapshots_raw_ref_fk
+          foreign key (raw_ref) references {raw_archive}(id);""",
+        f"create index if not exists idx_{table}_run_account on {table} (run_id, account_pk);",
+    ]
+
+
+def month_start(d):
+    return date(d.year, d.month, 1)
+
+
+def add_months(d, months):
+    years, month = divmod(d.month - 1 + months, 12)
+    return date(d.year + years, month + 1, 1)
+
+
+def key_month(value):
+    if isinstance(value, datetime):
+        value = value.astimezone(timezone.utc).date()
+    return month_start(value)
+
+
+def bound_literal(key_type, d):
+    if key_type == "timestamptz":
+        return f"'{d.isoformat()} 00:00:00+00'"
+    return f"'{d.isoformat()}'"
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def is_partitioned(conn, table):
+    with conn.cursor() as cur:
+        cur.execute("select exists (select 1 from pg_partitioned_table where partrelid = to_regclass(%s));", (table,))
+        return cur.fetchone()[0]
+
+
+def secure_table(cur, table):
+    cur.execute(f"alter table {table} enable row level security;")
+    cur.execute(f"revoke all on {table} from anon, authenticated;")
+
+
+def create_partition(conn, table_key, month):
+    spec = PARTITION_SPECS[table_key]
+    table = TABLES[table_key]
+    name = partition_name(table, month)
+    lo = bound_literal(spec["key_type"], month)
+    hi = bound_literal(spec["key_type"], add_months(month, 1))
+    key = spec["key"]
+    with conn.cursor() as cur:
+        cur.execute("select to_regclass(%s) is not null;", (name,))
+        if cur.fetchone()[0]:
+            return False
+        cur.execute(f"select exists (select 1 from {table}_default where {key} >= {lo} and {key} < {hi});")
+        if cur.fetchone()[0]:
+            cur.execute(f"create table {name} (like {table} including defaults including constraints);")
+            cur.execute(
+                f"""
+                with moved as (
+                  delete from {table}_default
+                  where {key} >= {lo} and {key} < {hi}
+                  returning *
+                )
+                insert into {name} select * from moved;
+                """
+            )
+            cur.execute(f"alter table {table} attach partition {name} for values from ({lo}) to ({hi});")
+        else:
+            cur.execute(f"create table {name} partition of {table} for values from ({lo}) to ({hi});")
+        secure_table(cur, name)
+    return True
+
+
+def ensure_partitions(conn, table_key, first_month, last_month):
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_partition(conn, table_key, month):
+            created.append(partition_name(TABLES[table_key], month))
+        month = add_months(month, 1)
+    return created
+
+
+def secondary_index_definitions(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            select pg_get_indexdef(i.indexrelid)
+            from pg_index i
+            where i.indrelid = to_regclass(%s)
+              and not i.indisunique
+              and not i.indisprimary
+            order by i.indexrelid;
+            """,
+            (table,),
+        )
+        return [row[0].replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1) for row in cur.fetchall()]
+
+
+def convert_to_partitioned(conn, table_key, months_ahead=PARTITION_MONTHS_AHEAD):
+    spec = PARTITION_SPECS[table_key]
+    table = TABLES[table_key]
+    legacy = f"{table}_legacy"
+    key = spec["key"]
+    if is_partitioned(conn, table):
+        return False
+    with conn.cursor() as cur:
+        cur.execute(f"lock table {table} in access exclusive mode;")
+        cur.execute(f"select min({key}), max({key}) from {table};")
+        lo, hi = cur.fetchone()
+        cur.execute("select pg_get_serial_sequence(%s, 'id');", (table,))
+        sequence = cur.fetchone()[0]
+        indexes = secondary_index_definitions(conn, table)
+        cur.execute(f"alter table {table} rename to {legacy};")
+        cur.execute(
+            f"""
+            create table {table} (like {legacy} including defaults including constraints including storage)
+            partition by range ({key});
+            """
+        )
+        cur.execute(f"create table {table}_default partition of {table} default;")
+        secure_table(cur, f"{table}_default")
+    this_month = month_start(date.today())
+    first = min(key_month(lo), this_month) if lo is not None else this_month
+    last = max(key_month(hi), this_month) if hi is not None else this_month
+    ensure_partitions(conn, table_key, first, add_months(last, months_ahead))
+    with conn.cursor() as cur:
+        cur.execute(f"insert into {table} select * from {legacy};")
+        cur.execute(f"alter sequence {sequence} owned by {table}.id;")
+        cur.execute(f"drop table {legacy};")
+        for statement in partitioned_constraints(table_key):
+            cur.execute(statement)
+        for statement in indexes:
+            cur.execute(statement)
+        secure_table(cur, table)
+        if table_key == "transactions" and rollups_installed(conn):
+            install_rollup_triggers(conn)
+        cur.execute(f"grant select, insert, update, delete on {table} to service_role;")
+        cur.execute(f"drop policy if exists service_role_all on {table};")
+        cur.execute(
+            f"create policy service_role_all on {table} for all to service_role using (true) with check (true);"
+        )
+    return True
+
+
+def maintain_partitions(conn, months_ahead=PARTITION_MONTHS_AHEAD):
+    this_month = month_start(date.today())
+    created = []
+    for table_key in PARTITION_SPECS:
+        if is_partitioned(conn, TABLES[table_key]):
+            created.extend(ensure_partitions(conn, table_key, this_month, add_months(this_month, months_ahead)))
+    return created
+
+
+def list_partitions(conn, table):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            select c.relname
+            from pg_inherits i
+            join pg_class c
+              on c.oid = i.inhrelid
+            where i.inhparent = to_regclass(%s)
+            order by c.relname;
+            """,
+            (table,),
+        )
+        return [row[0] for row in cur.fetchall()]
+
+
+def detach_partitions_before(conn, table_key, cutoff_month, drop=False):
+    table = TABLES[table_key]
+    detached = []
+    for name in list_partitions(conn, table):
+        match = PARTITION_SUFFIX.search(name)
+        if not match or date(int(match.group(1)), int(match.group(2)), 1) >= cutoff_month:
+            continue
+        with conn.cursor() as cur:
+            cur.execute(f"alter table {table} detach partition {name};")
+            if drop:
+                cur.execute(f"drop table {name};")
+        detached.append(name)
+    return detached
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage range partitions for transactions and balance_snapshots.")
+    parser.add_argument("--convert", action="store_true", help="convert existing heap tables to partitioned tables")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--detach-before", help="detach monthly partitions older than this month (YYYY-MM)")
+    parser.add_argument("--drop", action="store_true", help="drop partitions after detaching them")
+    parser.add_argument("--table", choices=sorted(PARTITION_SPECS), action="append")
+    args = parser.parse_args()
+    table_keys = args.table or list(PARTITION_SPECS)
+    with psycopg.connect(DATABASE_URL) as conn:
+        if args.convert:
+            for table_key in table_keys:
+                converted = convert_to_partitioned(conn, table_key, args.months_ahead)
+                conn.commit()
+                print(f"{TABLES[table_key]}: {'converted' if converted else 'already partitioned'}")
+        for name in maintain_partitions(conn, args.months_ahead):
+            print(f"created partition {name}")
+        conn.commit()
+        if args.detach_before:
+            cutoff = date.fromisoformat(f"{args.detach_before}-01")
+            for table_key in table_keys:
+                for name in detach_partitions_before(conn, table_key, cutoff, drop=args.drop):
+                    print(f"{'dropped' if args.drop else 'detached'} partition {name}")
+                conn.commit()
+    print("Partition maintenance complete.")
+
+
+if __name__ == "__main__":
+    main()
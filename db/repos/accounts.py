@@ -1,5 +1,6 @@
 from psycopg.types.json import Json
 from config import TABLES
+from db.repos.raw_archive import raw_columns, raw_columns_many, raw_columns_many_async
 
 ACCOUNTS_TABLE = TABLES["accounts"]
 
@@ -31,10 +32,10 @@ def upsert_account(
     sql = f"""
     insert into {ACCOUNTS_TABLE}
       (plaid_item_pk, account_id, name, official_name, type, subtype, mask, iso_currency_code,
-       include_in_app, active, raw, updated_at)
+       include_in_app, active, raw, raw_ref, updated_at)
     values
       (%s, %s, %s, %s, %s, %s, %s, %s,
-       coalesce(%s, true), coalesce(%s, true), %s, now())
+       coalesce(%s, true), coalesce(%s, true), %s, %s, now())
     on conflict (plaid_item_pk, account_id) do update set
       name = excluded.name,
       official_name = excluded.official_name,
@@ -43,11 +44,13 @@ def upsert_account(
       mask = excluded.mask,
       iso_currency_code = excluded.iso_currency_code,
       raw = excluded.raw,
+      raw_ref = excluded.raw_ref,
       include_in_app = coalesce(%s, {ACCOUNTS_TABLE}.include_in_app),
       active = coalesce(%s, {ACCOUNTS_TABLE}.active),
       updated_at = now()
     returning id;
     """
+    raw, raw_ref = raw_columns(conn, raw)
     with conn.cursor() as cur:
         cur.execute(
             sql,
@@ -63,6 +66,7 @@ def upsert_account(
                 include_in_app,
                 active,
                 to_json(raw),
+                raw_ref,
                 include_in_app,
                 active,
             ),
@@ -70,14 +74,87 @@ def upsert_account(
         return cur.fetchone()[0]
 
 
-def get_included_accounts(conn, plaid_item_pk):
+def unique_accounts(accounts):
+    return list({a["account_id"]: a for a in accounts}.values())
+
+
+def upsert_accounts_statement(plaid_item_pk, rows, raws):
+    values = ",\n      ".join(["(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, now())"] * len(rows))
     sql = f"""
-    select id, account_id
-    from {ACCOUNTS_TABLE}
-    where plaid_item_pk = %s
-      and include_in_app = true
-      and active = true;
+    insert into {ACCOUNTS_TABLE}
+      (plaid_item_pk, account_id, name, official_name, type, subtype, mask, iso_currency_code,
+       raw, raw_ref, updated_at)
+    values
+      {values}
+    on conflict (plaid_item_pk, account_id) do update set
+      name = excluded.name,
+      official_name = excluded.official_name,
+      type = excluded.type,
+      subtype = excluded.subtype,
+      mask = excluded.mask,
+      iso_currency_code = excluded.iso_currency_code,
+      raw = excluded.raw,
+      raw_ref = excluded.raw_ref,
+      updated_at = now()
+    returning id, account_id, include_in_app, active;
     """
+    params = []
+    for a, (raw, raw_ref) in zip(rows, raws):
+        params.extend(
+            (
+                plaid_item_pk,
+                a["account_id"],
+                a.get("name"),
+                a.get("official_name"),
+                to_text(a.get("type")),
+                to_text(a.get("subtype")),
+                a.get("mask"),
+                a.get("iso_currency_code"),
+                to_json(raw),
+                raw_ref,
+            )
+        )
+    return sql, params
+
+
+def upsert_accounts(conn, plaid_item_pk, accounts):
+    rows = unique_accounts(accounts)
+    if not rows:
+        return []
+    raws = raw_columns_many(conn, [a.get("raw") for a in rows])
+    sql, params = upsert_accounts_statement(plaid_item_pk, rows, raws)
     with conn.cursor() as cur:
-        cur.execute(sql, (plaid_item_pk,))
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+async def upsert_accounts_async(conn, plaid_item_pk, accounts):
+    rows = unique_accounts(accounts)
+    if not rows:
+        return []
+    raws = await raw_columns_many_async(conn, [a.get("raw") for a in rows])
+    sql, params = upsert_accounts_statement(plaid_item_pk, rows, raws)
+    async with conn.cursor() as cur:
+        await cur.execute(sql, params)
+        return await cur.fetchall()
+
+
+INCLUDED_ACCOUNTS_SQL = f"""
+select id, account_id
+from {ACCOUNTS_TABLE}
+where plaid_item_pk = %s
+  and include_in_app = true
+  and active = true;
+"""
+
+
+def get_included_accounts(conn, plaid_item_pk):
+    with conn.cursor() as cur:
+        cur.execute(INCLUDED_ACCOUNTS_SQL, (plaid_item_pk,))
         return {account_id: account_pk for (account_pk, account_id) in cur.fetchall()}
+
+
+async def get_included_accounts_async(conn, plaid_item_pk):
+    async with conn.cursor() as cur:
+        await cur.execute(INCLUDED_ACCOUNTS_SQL, (plaid_item_pk,))
+        return {account_id: account_pk for (account_pk, account_id) in await cur.fetchall()}
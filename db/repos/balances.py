@@ -1,5 +1,6 @@
 from psycopg.types.json import Json
-from config import TABLES
+from config import TABLES, DB_PARTITIONED
+from db.repos.raw_archive import raw_columns, raw_columns_many, raw_columns_many_async
 
 BALANCE_SNAPSHOTS_TABLE = TABLES["balance_snapshots"]
 
@@ -10,6 +11,76 @@ def to_json(v):
     return Json(v)
 
 
+def snapshots_partitioned_sql(count):
+    row = (
+        "(%s::bigint, %s::bigint, %s::numeric, %s::numeric, %s::numeric, "
+        "%s::text, %s::timestamptz, %s::jsonb, %s::bigint)"
+    )
+    values = ",\n        ".join([row] * count)
+    return f"""
+    with src (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw, raw_ref) as (
+      values
+        {values}
+    ),
+    updated as (
+      update {BALANCE_SNAPSHOTS_TABLE} bs set
+        current = src.current,
+        available = src.available,
+        credit_limit = src.credit_limit,
+        iso_currency_code = src.iso_currency_code,
+        snapshot_at = coalesce(src.snapshot_at, now()),
+        raw = src.raw,
+        raw_ref = src.raw_ref
+      from src
+      where bs.run_id = src.run_id
+        and bs.account_pk = src.account_pk
+      returning bs.account_pk
+    ),
+    inserted as (
+      insert into {BALANCE_SNAPSHOTS_TABLE}
+        (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw, raw_ref)
+      select
+        src.run_id, src.account_pk, src.current, src.available, src.credit_limit, src.iso_currency_code,
+        coalesce(src.snapshot_at, now()), src.raw, src.raw_ref
+      from src
+      where not exists (
+        select 1 from {BALANCE_SNAPSHOTS_TABLE} e
+        where e.run_id = src.run_id
+          and e.account_pk = src.account_pk
+      )
+      returning account_pk
+    )
+    select (select count(*) from updated) + (select count(*) from inserted);
+    """
+
+
+def partitioned_snapshot_params(run_id, rows, raws):
+    params = []
+    for s, (raw, raw_ref) in zip(rows, raws):
+        params.extend(
+            (
+                run_id,
+                s["account_pk"],
+                s.get("current"),
+                s.get("available"),
+                s.get("credit_limit"),
+                s.get("iso_currency_code"),
+                s.get("snapshot_at"),
+                to_json(raw),
+                raw_ref,
+            )
+        )
+    return params
+
+
+def written_count(cur):
+    return cur.fetchone()[0] if DB_PARTITIONED else cur.rowcount
+
+
+async def written_count_async(cur):
+    return (await cur.fetchone())[0] if DB_PARTITIONED else cur.rowcount
+
+
 def upsert_balance_snapshot(
     conn,
     run_id,
@@ -21,19 +92,33 @@ def upsert_balance_snapshot(
     snapshot_at=None,
     raw=None,
 ):
+    raw, raw_ref = raw_columns(conn, raw)
+    if DB_PARTITIONED:
+        row = {
+            "account_pk": account_pk,
+            "current": current,
+            "available": available,
+            "credit_limit": credit_limit,
+            "iso_currency_code": iso_currency_code,
+            "snapshot_at": snapshot_at,
+        }
+        with conn.cursor() as cur:
+            cur.execute(snapshots_partitioned_sql(1), partitioned_snapshot_params(run_id, [row], [(raw, raw_ref)]))
+        return
     if snapshot_at is None:
         sql = f"""
         insert into {BALANCE_SNAPSHOTS_TABLE}
-          (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw)
+          (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw, raw_ref)
         values
-          (%s, %s, %s, %s, %s, %s, now(), %s)
+          (%s, %s, %s, %s, %s, %s, now(), %s, %s)
         on conflict (run_id, account_pk) do update set
           current = excluded.current,
           available = excluded.available,
           credit_limit = excluded.credit_limit,
           iso_currency_code = excluded.iso_currency_code,
           snapshot_at = excluded.snapshot_at,
-          raw = excluded.raw;
+          raw = excluded.raw,
+          raw_ref = excluded.raw_ref;
         """
         params = (
             run_id,
@@ -43,20 +128,22 @@ def upsert_balance_snapshot(
             credit_limit,
             iso_currency_code,
             to_json(raw),
+            raw_ref,
         )
     else:
         sql = f"""
         insert into {BALANCE_SNAPSHOTS_TABLE}
-          (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw)
+          (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw, raw_ref)
         values
-          (%s, %s, %s, %s, %s, %s, %s, %s)
+          (%s, %s, %s, %s, %s, %s, %s, %s, %s)
         on conflict (run_id, account_pk) do update set
           current = excluded.current,
           available = excluded.available,
           credit_limit = excluded.credit_limit,
           iso_currency_code = excluded.iso_currency_code,
           snapshot_at = excluded.snapshot_at,
-          raw = excluded.raw;
+          raw = excluded.raw,
+          raw_ref = excluded.raw_ref;
         """
         params = (
             run_id,
@@ -67,6 +154,68 @@ def upsert_balance_snapshot(
             iso_currency_code,
             snapshot_at,
             to_json(raw),
+            raw_ref,
         )
     with conn.cursor() as cur:
-        cur.execute(sql, params)
\ No newline at end of file
+        cur.execute(sql, params)
+
+
+def unique_snapshots(snapshots):
+    return list({s["account_pk"]: s for s in snapshots}.values())
+
+
+def insert_balance_snapshots_statement(run_id, rows, raws):
+    if DB_PARTITIONED:
+        return snapshots_partitioned_sql(len(rows)), partitioned_snapshot_params(run_id, rows, raws)
+    values = ",\n      ".join(["(%s, %s, %s, %s, %s, %s, now(), %s, %s)"] * len(rows))
+    sql = f"""
+    insert into {BALANCE_SNAPSHOTS_TABLE}
+      (run_id, account_pk, current, available, credit_limit, iso_currency_code, snapshot_at, raw, raw_ref)
+    values
+      {values}
+    on conflict (run_id, account_pk) do update set
+      current = excluded.current,
+      available = excluded.available,
+      credit_limit = excluded.credit_limit,
+      iso_currency_code = excluded.iso_currency_code,
+      snapshot_at = excluded.snapshot_at,
+      raw = excluded.raw,
+      raw_ref = excluded.raw_ref;
+    """
+    params = []
+    for s, (raw, raw_ref) in zip(rows, raws):
+        params.extend(
+            (
+                run_id,
+                s["account_pk"],
+                s.get("current"),
+                s.get("available"),
+                s.get("credit_limit"),
+                s.get("iso_currency_code"),
+                to_json(raw),
+                raw_ref,
+            )
+        )
+    return sql, params
+
+
+def insert_balance_snapshots(conn, run_id, snapshots):
+    rows = unique_snapshots(snapshots)
+    if not rows:
+        return 0
+    raws = raw_columns_many(conn, [s.get("raw") for s in rows])
+    sql, params = insert_balance_snapshots_statement(run_id, rows, raws)
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return written_count(cur)
+
+
+async def insert_balance_snapshots_async(conn, run_id, snapshots):
+    rows = unique_snapshots(snapshots)
+    if not rows:
+        return 0
+    raws = await raw_columns_many_async(conn, [s.get("raw") for s in rows])
+    sql, params = insert_balance_snapshots_statement(run_id, rows, raws)
+    async with conn.cursor() as cur:
+        await cur.execute(sql, params)
+        return await written_count_async(cur)
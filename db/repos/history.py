@@ -0,0 +1,160 @@
+from config import TABLES, TIMEZONE, PLAID_ENV
+
+BALANCE_HISTORY_TABLE = TABLES["balance_history"]
+NET_WORTH_HISTORY_TABLE = TABLES["net_worth_history"]
+BALANCE_SNAPSHOTS_TABLE = TABLES["balance_snapshots"]
+ACCOUNTS_TABLE = TABLES["accounts"]
+RUNS_TABLE = TABLES["runs"]
+
+SQL_TZ = TIMEZONE or "America/New_York"
+
+CREATE_HISTORY_SQL = f"""
+create table if not exists {BALANCE_HISTORY_TABLE} (
+  day date not null,
+  account_pk bigint not null references {ACCOUNTS_TABLE}(id) on delete cascade,
+  run_id bigint not null,
+  current numeric,
+  available numeric,
+  current_signed numeric not null,
+  recorded_at timestamptz not null default now(),
+  primary key (day, account_pk)
+);
+
+create index if not exists idx_{BALANCE_HISTORY_TABLE}_account_day
+  on {BALANCE_HISTORY_TABLE} (account_pk, day);
+
+create table if not exists {NET_WORTH_HISTORY_TABLE} (
+  day date primary key,
+  run_id bigint not null,
+  net_worth numeric not null,
+  account_count integer not null,
+  recorded_at timestamptz not null default now()
+);
+
+alter table {BALANCE_HISTORY_TABLE} enable row level security;
+alter table {NET_WORTH_HISTORY_TABLE} enable row level security;
+
+revoke all on {BALANCE_HISTORY_TABLE} from anon, authenticated;
+grant select, insert, update, delete on {BALANCE_HISTORY_TABLE} to service_role;
+
+drop policy if exists service_role_all on {BALANCE_HISTORY_TABLE};
+create policy service_role_all on {BALANCE_HISTORY_TABLE}
+for all to service_role using (true) with check (true);
+
+revoke all on {NET_WORTH_HISTORY_TABLE} from anon, authenticated;
+grant select, insert, update, delete on {NET_WORTH_HISTORY_TABLE} to service_role;
+
+drop policy if exists service_role_all on {NET_WORTH_HISTORY_TABLE};
+create policy service_role_all on {NET_WORTH_HISTORY_TABLE}
+for all to service_role using (true) with check (true);
+"""
+
+RECORD_BALANCE_HISTORY_SQL = f"""
+with run as (
+  select id, started_at, (started_at at time zone '{SQL_TZ}')::date as day
+  from {RUNS_TABLE}
+  where id = %(run_id)s
+    and env = %(env)s
+)
+insert into {BALANCE_HISTORY_TABLE} (day, account_pk, run_id, current, available, current_signed, recorded_at)
+select
+  run.day,
+  bs.account_pk,
+  bs.run_id,
+  bs.current,
+  bs.available,
+  case
+    when a.type in ('credit', 'loan') then -abs(coalesce(bs.current, 0))
+    else coalesce(bs.current, 0)
+  end,
+  now()
+from {BALANCE_SNAPSHOTS_TABLE} bs
+join run
+  on run.id = bs.run_id
+join {ACCOUNTS_TABLE} a
+  on a.id = bs.account_pk
+where bs.snapshot_at >= run.started_at
+on conflict (day, account_pk) do update set
+  run_id = excluded.run_id,
+  current = excluded.current,
+  available = excluded.available,
+  current_signed = excluded.current_signed,
+  recorded_at = now()
+where {BALANCE_HISTORY_TABLE}.run_id <= excluded.run_id;
+"""
+
+RECORD_NET_WORTH_SQL = f"""
+with run as (
+  select id, (started_at at time zone '{SQL_TZ}')::date as day
+  from {RUNS_TABLE}
+  where id = %(run_id)s
+    and env = %(env)s
+),
+latest as (
+  select distinct on (h.account_pk) h.account_pk, h.current_signed
+  from {BALANCE_HISTORY_TABLE} h
+  join run
+    on h.day <= run.day
+  join {ACCOUNTS_TABLE} a
+    on a.id = h.account_pk
+  where a.include_in_app = true
+    and a.active = true
+  order by h.account_pk, h.day desc
+)
+insert into {NET_WORTH_HISTORY_TABLE} (day, run_id, net_worth, account_count, recorded_at)
+select run.day, run.id, coalesce(sum(l.current_signed), 0), count(l.account_pk), now()
+from run
+left join latest l
+  on true
+group by run.day, run.id
+on conflict (day) do update set
+  run_id = excluded.run_id,
+  net_worth = excluded.net_worth,
+  account_count = excluded.account_count,
+  recorded_at = now()
+where {NET_WORTH_HISTORY_TABLE}.run_id <= excluded.run_id;
+"""
+
+HISTORY_RUNS_SQL = f"""
+select r.id
+from {RUNS_TABLE} r
+where r.status = 'success'
+  and r.env = %s
+  and exists (select 1 from {BALANCE_SNAPSHOTS_TABLE} bs where bs.run_id = r.id)
+order by r.id;
+"""
+
+
+def history_params(run_id):
+    return {"run_id": run_id, "env": PLAID_ENV}
+
+
+def record_run_history(conn, run_id):
+    with conn.cursor() as cur:
+        cur.execute(RECORD_BALANCE_HISTORY_SQL, history_params(run_id))
+        if cur.rowcount == 0:
+            return 0
+        recorded = cur.rowcount
+        cur.execute(RECORD_NET_WORTH_SQL, history_params(run_id))
+        return recorded
+
+
+async def record_run_history_async(conn, run_id):
+    async with conn.cursor() as cur:
+        await cur.execute(RECORD_BALANCE_HISTORY_SQL, history_params(run_id))
+        if cur.rowcount == 0:
+            return 0
+        recorded = cur.rowcount
+        await cur.execute(RECORD_NET_WORTH_SQL, history_params(run_id))
+        return recorded
+
+
+def rebuild_history(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"delete from {BALANCE_HISTORY_TABLE};")
+        cur.execute(f"delete from {NET_WORTH_HISTORY_TABLE};")
+        cur.execute(HISTORY_RUNS_SQL, (PLAID_ENV,))
+        run_ids = [row[0] for row in cur.fetchall()]
+    for run_id in run_ids:
+        record_run_history(conn, run_id)
+    return len(run_ids)
@@ -1,6 +1,9 @@
 from config import TABLES, PLAID_ENV, PLAID_TOKEN_KEY
+from db.repos.webhook_events import TRANSACTIONS_UPDATE_CODES
 
 PLAID_ITEMS_TABLE = TABLES["plaid_items"]
+CURSORS_TABLE = TABLES["cursors"]
+PLAID_WEBHOOK_EVENTS_TABLE = TABLES["plaid_webhook_events"]
 
 
 def resolve_env(env_override):
@@ -70,6 +73,20 @@ def get_item(conn, plaid_item_pk):
         return dict(zip(cols, row))
 
 
+def get_plaid_item_pk_by_item_id(conn, item_id, active_only=True):
+    active_clause = "and active = true" if active_only else ""
+    sql = f"""
+    select id
+    from {PLAID_ITEMS_TABLE}
+    where item_id = %s
+      {active_clause};
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (item_id,))
+        row = cur.fetchone()
+        return row[0] if row else None
+
+
 def get_item_id_by_label(conn, label, env_override=None, active_only=True):
     env_value = resolve_env(env_override)
     active_clause = "and active = true" if active_only else ""
@@ -173,31 +190,103 @@ def get_access_token(conn, plaid_item_pk):
         return row[0] if row else None
 
 
+INGEST_ACCESS_TOKENS_SQL = f"""
+select id, pgp_sym_decrypt(access_token_enc, %s::text)::text as access_token
+from {PLAID_ITEMS_TABLE}
+where env = %s
+  and active = true
+  and (balances_enabled = true or transactions_enabled = true);
+"""
+
+ITEMS_FOR_BALANCES_SQL = f"""
+select id, label
+from {PLAID_ITEMS_TABLE}
+where balances_enabled = true
+  and env = %s
+  and active = true
+order by id;
+"""
+
+ITEMS_FOR_TRANSACTIONS_SQL = f"""
+select id, label
+from {PLAID_ITEMS_TABLE}
+where transactions_enabled = true
+  and env = %s
+  and active = true
+order by id;
+"""
+
+DIRTY_ITEMS_FOR_TRANSACTIONS_SQL = f"""
+select pi.id, pi.label
+from {PLAID_ITEMS_TABLE} pi
+left join {CURSORS_TABLE} c
+  on c.plaid_item_pk = pi.id
+where pi.transactions_enabled = true
+  and pi.env = %s
+  and pi.active = true
+  and (
+    c.transactions_cursor is null
+    or exists (
+      select 1
+      from {PLAID_WEBHOOK_EVENTS_TABLE} e
+      where e.item_id = pi.item_id
+        and e.webhook_type = 'TRANSACTIONS'
+        and e.webhook_code = any(%s::text[])
+        and e.received_at > c.updated_at
+    )
+    or (%s::int is not null and c.updated_at < now() - make_interval(hours => %s::int))
+  )
+order by pi.id;
+"""
+
+
+def dirty_items_params(env_override, full_sweep_hours):
+    return (resolve_env(env_override), list(TRANSACTIONS_UPDATE_CODES), full_sweep_hours, full_sweep_hours)
+
+
+def get_ingest_access_tokens(conn, env_override=None):
+    with conn.cursor() as cur:
+        cur.execute(INGEST_ACCESS_TOKENS_SQL, (PLAID_TOKEN_KEY, resolve_env(env_override)))
+        return dict(cur.fetchall())
+
+
+async def get_ingest_access_tokens_async(conn, env_override=None):
+    async with conn.cursor() as cur:
+        await cur.execute(INGEST_ACCESS_TOKENS_SQL, (PLAID_TOKEN_KEY, resolve_env(env_override)))
+        return dict(await cur.fetchall())
+
+
 def list_items_for_balances(conn, env_override=None):
-    env_value = resolve_env(env_override)
-    sql = f"""
-    select id, label
-    from {PLAID_ITEMS_TABLE}
-    where balances_enabled = true
-      and env = %s
-      and active = true
-    order by id;
-    """
     with conn.cursor() as cur:
-        cur.execute(sql, (env_value,))
+        cur.execute(ITEMS_FOR_BALANCES_SQL, (resolve_env(env_override),))
         return cur.fetchall()
 
 
+async def list_items_for_balances_async(conn, env_override=None):
+    async with conn.cursor() as cur:
+        await cur.execute(ITEMS_FOR_BALANCES_SQL, (resolve_env(env_override),))
+        return await cur.fetchall()
+
+
 def list_items_for_transactions(conn, env_override=None):
-    env_value = resolve_env(env_override)
-    sql = f"""
-    select id, label
-    from {PLAID_ITEMS_TABLE}
-    where transactions_enabled = true
-      and env = %s
-      and active = true
-    order by id;
-    """
     with conn.cursor() as cur:
-        cur.execute(sql, (env_value,))
-        return cur.fetchall()
\ No newline at end of file
+        cur.execute(ITEMS_FOR_TRANSACTIONS_SQL, (resolve_env(env_override),))
+        return cur.fetchall()
+
+
+async def list_items_for_transactions_async(conn, env_override=None):
+    async with conn.cursor() as cur:
+        await cur.execute(ITEMS_FOR_TRANSACTIONS_SQL, (resolve_env(env_override),))
+        return await cur.fetchall()
+
+
+def list_dirty_items_for_transactions(conn, env_override=None, full_sweep_hours=None):
+    with conn.cursor() as cur:
+        cur.execute(DIRTY_ITEMS_FOR_TRANSACTIONS_SQL, dirty_items_params(env_override, full_sweep_hours))
+        return cur.fetchall()
+
+
+async def list_dirty_items_for_transactions_async(conn, env_override=None, full_sweep_hours=None):
+    async with conn.cursor() as cur:
+        await cur.execute(DIRTY_ITEMS_FOR_TRANSACTIONS_SQL, dirty_items_params(env_override, full_sweep_hours))
+        return await cur.fetchall()
@@ -0,0 +1,100 @@
+from config import TABLES
+
+PDF_CACHE_TABLE = TABLES["pdf_cache"]
+RUNS_TABLE = TABLES["runs"]
+
+CREATE_PDF_CACHE_SQL = f"""
+create table if not exists {PDF_CACHE_TABLE} (
+  run_id bigint not null references {RUNS_TABLE}(id) on delete cascade,
+  content_hash text not null,
+  pdf bytea not null,
+  size_bytes integer not null,
+  render_ms integer not null,
+  hits integer not null default 0,
+  misses integer not null default 1,
+  created_at timestamptz not null default now(),
+  last_used_at timestamptz not null default now(),
+  primary key (run_id, content_hash)
+);
+
+create index if not exists idx_{PDF_CACHE_TABLE}_last_used
+  on {PDF_CACHE_TABLE} (last_used_at);
+
+alter table {PDF_CACHE_TABLE} enable row level security;
+
+revoke all on {PDF_CACHE_TABLE} from anon, authenticated;
+grant select, insert, update, delete on {PDF_CACHE_TABLE} to service_role;
+
+drop policy if exists service_role_all on {PDF_CACHE_TABLE};
+create policy service_role_all on {PDF_CACHE_TABLE}
+for all to service_role using (true) with check (true);
+"""
+
+GET_CACHED_PDF_SQL = f"""
+update {PDF_CACHE_TABLE}
+set hits = hits + 1,
+    last_used_at = now()
+where run_id = %s
+  and content_hash = %s
+returning pdf;
+"""
+
+PUT_CACHED_PDF_SQL = f"""
+insert into {PDF_CACHE_TABLE} (run_id, content_hash, pdf, size_bytes, render_ms)
+values (%s, %s, %s, %s, %s)
+on conflict (run_id, content_hash) do update set
+  pdf = excluded.pdf,
+  size_bytes = excluded.size_bytes,
+  render_ms = excluded.render_ms,
+  misses = {PDF_CACHE_TABLE}.misses + 1,
+  last_used_at = now();
+"""
+
+EVICT_PDF_CACHE_SQL = f"""
+delete from {PDF_CACHE_TABLE} c
+using (
+  select run_id, content_hash
+  from (
+    select
+      run_id,
+      content_hash,
+      sum(size_bytes) over (order by last_used_at desc, run_id desc, content_hash) as retained_bytes
+    from {PDF_CACHE_TABLE}
+  ) ranked
+  where retained_bytes > %s
+) stale
+where c.run_id = stale.run_id
+  and c.content_hash = stale.content_hash;
+"""
+
+PDF_CACHE_STATS_SQL = f"""
+select
+  count(*) as entries,
+  coalesce(sum(size_bytes), 0) as total_bytes,
+  coalesce(sum(hits), 0) as hits,
+  coalesce(sum(misses), 0) as misses,
+  coalesce(avg(render_ms), 0) as avg_render_ms,
+  coalesce(max(render_ms), 0) as max_render_ms
+from {PDF_CACHE_TABLE};
+"""
+
+
+def get_cached_pdf(conn, run_id, content_hash):
+    with conn.cursor() as cur:
+        cur.execute(GET_CACHED_PDF_SQL, (run_id, content_hash))
+        row = cur.fetchone()
+        return None if row is None else bytes(row[0])
+
+
+def put_cached_pdf(conn, run_id, content_hash, pdf_bytes, render_ms, max_bytes):
+    with conn.cursor() as cur:
+        cur.execute(PUT_CACHED_PDF_SQL, (run_id, content_hash, pdf_bytes, len(pdf_bytes), render_ms))
+        cur.execute(EVICT_PDF_CACHE_SQL, (max_bytes,))
+        return cur.rowcount
+
+
+def pdf_cache_stats(conn):
+    with conn.cursor() as cur:
+        cur.execute(PDF_CACHE_STATS_SQL)
+        cols = [desc[0] for desc in cur.description]
+        return dict(zip(cols, cur.fetchone()))
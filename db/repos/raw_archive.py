@@ -0,0 +1,144 @@
+from datetime import date, datetime
+import hashlib
+import json
+import zlib
+from config import TABLES, RAW_ARCHIVE_ENABLED, RAW_ARCHIVE_COMPRESSION_LEVEL
+
+RAW_ARCHIVE_TABLE = TABLES["raw_archive"]
+
+
+def json_default(o):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    return str(o)
+
+
+def encode_payload(raw):
+    data = json.dumps(raw, default=json_default, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return hashlib.sha256(data).hexdigest(), len(data), zlib.compress(data, RAW_ARCHIVE_COMPRESSION_LEVEL)
+
+
+def decode_payload(codec, payload):
+    if codec != "zlib":
+        raise RuntimeError(f"Unsupported raw archive codec: {codec}")
+    return json.loads(zlib.decompress(bytes(payload)))
+
+
+LOOKUP_IDS_SQL = f"select digest, id from {RAW_ARCHIVE_TABLE} where digest = any(%s::text[]);"
+
+
+def lookup_ids(conn, digests):
+    with conn.cursor() as cur:
+        cur.execute(LOOKUP_IDS_SQL, (list(digests),))
+        return dict(cur.fetchall())
+
+
+async def lookup_ids_async(conn, digests):
+    async with conn.cursor() as cur:
+        await cur.execute(LOOKUP_IDS_SQL, (list(digests),))
+        return dict(await cur.fetchall())
+
+
+def encode_payloads(payloads):
+    encoded = [None if raw is None else encode_payload(raw) for raw in payloads]
+    return encoded, {e[0]: e for e in encoded if e is not None}
+
+
+def archive_statement(unique):
+    values = ",\n      ".join(["(%s, 'zlib', %s, %s)"] * len(unique))
+    sql = f"""
+    with inserted as (
+      insert into {RAW_ARCHIVE_TABLE} (digest, codec, raw_size, payload)
+      values
+        {values}
+      on conflict (digest) do nothing
+      returning digest, id
+    )
+    select digest, id from inserted
+    union all
+    select digest, id from {RAW_ARCHIVE_TABLE} where digest = any(%s::text[]);
+    """
+    params = []
+    for digest, raw_size, payload in unique.values():
+        params.extend((digest, raw_size, payload))
+    params.append(list(unique))
+    return sql, params
+
+
+def archive_payloads(conn, payloads):
+    encoded, unique = encode_payloads(payloads)
+    if not unique:
+        return [None] * len(encoded)
+    sql, params = archive_statement(unique)
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        ids = dict(cur.fetchall())
+    missing = [d for d in unique if d not in ids]
+    if missing:
+        ids.update(lookup_ids(conn, missing))
+    return [None if e is None else ids[e[0]] for e in encoded]
+
+
+async def archive_payloads_async(conn, payloads):
+    encoded, unique = encode_payloads(payloads)
+    if not unique:
+        return [None] * len(encoded)
+    sql, params = archive_statement(unique)
+    async with conn.cursor() as cur:
+        await cur.execute(sql, params)
+        ids = dict(await cur.fetchall())
+    missing = [d for d in unique if d not in ids]
+    if missing:
+        ids.update(await lookup_ids_async(conn, missing))
+    return [None if e is None else ids[e[0]] for e in encoded]
+
+
+def archive_payload(conn, raw):
+    return archive_payloads(conn, [raw])[0]
+
+
+def raw_columns(conn, raw):
+    if raw is None or not RAW_ARCHIVE_ENABLED:
+        return raw, None
+    return None, archive_payload(conn, raw)
+
+
+def raw_columns_many(conn, payloads):
+    payloads = list(payloads)
+    if not RAW_ARCHIVE_ENABLED:
+        return [(raw, None) for raw in payloads]
+    return [(None, ref) for ref in archive_payloads(conn, payloads)]
+
+
+async def raw_columns_many_async(conn, payloads):
+    payloads = list(payloads)
+    if not RAW_ARCHIVE_ENABLED:
+        return [(raw, None) for raw in payloads]
+    return [(None, ref) for ref in await archive_payloads_async(conn, payloads)]
+
+
+def fetch_raws(conn, archive_ids):
+    ids = [i for i in set(archive_ids) if i is not None]
+    if not ids:
+        return {}
+    sql = f"select id, codec, payload from {RAW_ARCHIVE_TABLE} where id = any(%s::bigint[]);"
+    with conn.cursor() as cur:
+        cur.execute(sql, (ids,))
+        return {archive_id: decode_payload(codec, payload) for archive_id, codec, payload in cur.fetchall()}
+
+
+def fetch_raw(conn, archive_id):
+    return fetch_raws(conn, [archive_id]).get(archive_id)
+
+
+def load_raw(conn, table_key, row_id):
+    sql = f"select raw, raw_ref from {TABLES[table_key]} where id = %s;"
+    with conn.cursor() as cur:
+        cur.execute(sql, (row_id,))
+        row = cur.fetchone()
+    if not row:
+        return None
+    raw, raw_ref = row
+    if raw is not None or raw_ref is None:
+        return raw
+    return fetch_raw(conn, raw_ref)
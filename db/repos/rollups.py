@@ -0,0 +1,162 @@
+from config import TABLES
+
+DAILY_ROLLUPS_TABLE = TABLES["daily_rollups"]
+TRANSACTIONS_TABLE = TABLES["transactions"]
+
+CREATE_ROLLUPS_SQL = f"""
+create table if not exists {DAILY_ROLLUPS_TABLE} (
+  day date not null,
+  account_pk bigint not null,
+  spent numeric not null default 0,
+  received numeric not null default 0,
+  tx_count integer not null default 0,
+  updated_at timestamptz not null default now(),
+  primary key (day, account_pk)
+);
+
+create index if not exists idx_{DAILY_ROLLUPS_TABLE}_account_day
+  on {DAILY_ROLLUPS_TABLE} (account_pk, day);
+
+alter table {DAILY_ROLLUPS_TABLE} enable row level security;
+
+revoke all on {DAILY_ROLLUPS_TABLE} from anon, authenticated;
+grant select, insert, update, delete on {DAILY_ROLLUPS_TABLE} to service_role;
+
+drop policy if exists service_role_all on {DAILY_ROLLUPS_TABLE};
+create policy service_role_all on {DAILY_ROLLUPS_TABLE}
+for all to service_role using (true) with check (true);
+"""
+
+
+def rollup_delta_sql(sources):
+    parts = []
+    for rows, sign in sources:
+        parts.append(
+            f"""
+        select date as day, account_pk,
+               {sign} greatest(amount, 0) as spent,
+               {sign} greatest(-amount, 0) as received,
+               {sign} 1 as tx_count
+        from {rows}
+        where not removed
+          and not coalesce(pending, false)
+          and date is not null"""
+        )
+    union = "\n        union all".join(parts)
+    return f"""
+      insert into {DAILY_ROLLUPS_TABLE} (day, account_pk, spent, received, tx_count, updated_at)
+      select day, account_pk, sum(spent), sum(received), sum(tx_count), now()
+      from ({union}
+      ) d
+      group by day, account_pk
+      having sum(spent) <> 0 or sum(received) <> 0 or sum(tx_count) <> 0
+      on conflict (day, account_pk) do update set
+        spent = {DAILY_ROLLUPS_TABLE}.spent + excluded.spent,
+        received = {DAILY_ROLLUPS_TABLE}.received + excluded.received,
+        tx_count = {DAILY_ROLLUPS_TABLE}.tx_count + excluded.tx_count,
+        updated_at = now();"""
+
+
+ROLLUP_TRIGGER_SQL = f"""
+create or replace function {DAILY_ROLLUPS_TABLE}_apply() returns trigger
+language plpgsql as $body$
+begin
+  if tg_op = 'INSERT' then{rollup_delta_sql([("new_rows", "+")])}
+  elsif tg_op = 'DELETE' then{rollup_delta_sql([("old_rows", "-")])}
+  else{rollup_delta_sql([("new_rows", "+"), ("old_rows", "-")])}
+  end if;
+  return null;
+end;
+$body$;
+
+drop trigger if exists {TRANSACTIONS_TABLE}_rollups_insert on {TRANSACTIONS_TABLE};
+create trigger {TRANSACTIONS_TABLE}_rollups_insert
+  after insert on {TRANSACTIONS_TABLE}
+  referencing new table as new_rows
+  for each statement execute function {DAILY_ROLLUPS_TABLE}_apply();
+
+drop trigger if exists {TRANSACTIONS_TABLE}_rollups_update on {TRANSACTIONS_TABLE};
+create trigger {TRANSACTIONS_TABLE}_rollups_update
+  after update on {TRANSACTIONS_TABLE}
+  referencing old table as old_rows new table as new_rows
+  for each statement execute function {DAILY_ROLLUPS_TABLE}_apply();
+
+drop trigger if exists {TRANSACTIONS_TABLE}_rollups_delete on {TRANSACTIONS_TABLE};
+create trigger {TRANSACTIONS_TABLE}_rollups_delete
+  after delete on {TRANSACTIONS_TABLE}
+  referencing old table as old_rows
+  for each statement execute function {DAILY_ROLLUPS_TABLE}_apply();
+"""
+
+EXPECTED_ROLLUPS_SQL = f"""
+select
+  t.date as day,
+  t.account_pk,
+  sum(greatest(t.amount, 0)) as spent,
+  sum(greatest(-t.amount, 0)) as received,
+  count(*) as tx_count
+from {TRANSACTIONS_TABLE} t
+where not t.removed
+  and not coalesce(t.pending, false)
+  and t.date is not null
+group by t.date, t.account_pk
+"""
+
+ROLLUP_MISMATCHES_SQL = f"""
+with expected as ({EXPECTED_ROLLUPS_SQL}),
+actual as (
+  select day, account_pk, spent, received, tx_count
+  from {DAILY_ROLLUPS_TABLE}
+  where spent <> 0 or received <> 0 or tx_count <> 0
+)
+select
+  coalesce(e.day, a.day) as day,
+  coalesce(e.account_pk, a.account_pk) as account_pk,
+  e.spent as expected_spent,
+  a.spent as actual_spent,
+  e.received as expected_received,
+  a.received as actual_received,
+  e.tx_count as expected_count,
+  a.tx_count as actual_count
+from expected e
+full join actual a
+  on a.day = e.day
+ and a.account_pk = e.account_pk
+where e.spent is distinct from a.spent
+   or e.received is distinct from a.received
+   or e.tx_count is distinct from a.tx_count
+order by 1, 2
+limit %s;
+"""
+
+
+def rollups_installed(conn):
+    with conn.cursor() as cur:
+        cur.execute("select to_regclass(%s) is not null;", (DAILY_ROLLUPS_TABLE,))
+        return cur.fetchone()[0]
+
+
+def install_rollup_triggers(conn):
+    with conn.cursor() as cur:
+        cur.execute(ROLLUP_TRIGGER_SQL)
+
+
+def rebuild_rollups(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"lock table {TRANSACTIONS_TABLE} in share mode;")
+        cur.execute(f"delete from {DAILY_ROLLUPS_TABLE};")
+        cur.execute(
+            f"""
+            insert into {DAILY_ROLLUPS_TABLE} (day, account_pk, spent, received, tx_count, updated_at)
+            select day, account_pk, spent, received, tx_count, now()
+            from ({EXPECTED_ROLLUPS_SQL}) e;
+            """
+        )
+        return cur.rowcount
+
+
+def find_rollup_mismatches(conn, limit=100):
+    with conn.cursor() as cur:
+        cur.execute(ROLLUP_MISMATCHES_SQL, (limit,))
+        cols = [desc[0] for desc in cur.description]
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
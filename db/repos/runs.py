@@ -1,27 +1,47 @@
+from psycopg.types.json import Jsonb
 from config import TABLES, PLAID_ENV
 
 RUNS_TABLE = TABLES["runs"]
 
+CREATE_RUN_SQL = f"""
+insert into {RUNS_TABLE} (run_type, env, status)
+values (%s, %s, 'running')
+returning id;
+"""
+
+FINISH_RUN_SQL = f"""
+update {RUNS_TABLE}
+set status = %s,
+    error = %s,
+    details = coalesce(%s, details),
+    finished_at = now()
+where id = %s;
+"""
+
+
+def finish_run_params(run_id, status, error, details):
+    return (status, error, None if details is None else Jsonb(details), run_id)
+
 
 def create_run(conn, run_type, env=None):
     env_value = env or PLAID_ENV
-    sql = f"""
-    insert into {RUNS_TABLE} (run_type, env, status)
-    values (%s, %s, 'running')
-    returning id;
-    """
     with conn.cursor() as cur:
-        cur.execute(sql, (run_type, env_value))
+        cur.execute(CREATE_RUN_SQL, (run_type, env_value))
         return cur.fetchone()[0]
 
 
-def finish_run(conn, run_id, status, error=None):
-    sql = f"""
-    update {RUNS_TABLE}
-    set status = %s,
-        error = %s,
-        finished_at = now()
-    where id = %s;
-    """
+async def create_run_async(conn, run_type, env=None):
+    env_value = env or PLAID_ENV
+    async with conn.cursor() as cur:
+        await cur.execute(CREATE_RUN_SQL, (run_type, env_value))
+        return (await cur.fetchone())[0]
+
+
+def finish_run(conn, run_id, status, error=None, details=None):
     with conn.cursor() as cur:
-        cur.execute(sql, (status, error, run_id))
\ No newline at end of file
+        cur.execute(FINISH_RUN_SQL, finish_run_params(run_id, status, error, details))
+
+
+async def finish_run_async(conn, run_id, status, error=None, details=None):
+    async with conn.cursor() as cur:
+        await cur.execute(FINISH_RUN_SQL, finish_run_params(run_id, status, error, details))
@@ -0,0 +1,130 @@
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from psycopg.types.json import Jsonb
+from config import TABLES
+
+RUN_SUMMARIES_TABLE = TABLES["run_summaries"]
+RUN_SUMMARY_TRANSACTIONS_TABLE = TABLES["run_summary_transactions"]
+RUNS_TABLE = TABLES["runs"]
+
+CREATE_RUN_SUMMARIES_SQL = f"""
+create table if not exists {RUN_SUMMARIES_TABLE} (
+  run_id bigint primary key references {RUNS_TABLE}(id) on delete cascade,
+  summary jsonb not null,
+  summary_hash text not null,
+  created_at timestamptz not null default now()
+);
+
+create table if not exists {RUN_SUMMARY_TRANSACTIONS_TABLE} (
+  run_id bigint not null references {RUNS_TABLE}(id) on delete cascade,
+  position integer not null,
+  tx jsonb not null,
+  primary key (run_id, position)
+);
+
+alter table {RUN_SUMMARIES_TABLE} enable row level security;
+alter table {RUN_SUMMARY_TRANSACTIONS_TABLE} enable row level security;
+
+revoke all on {RUN_SUMMARIES_TABLE} from anon, authenticated;
+grant select, insert, update, delete on {RUN_SUMMARIES_TABLE} to service_role;
+
+drop policy if exists service_role_all on {RUN_SUMMARIES_TABLE};
+create policy service_role_all on {RUN_SUMMARIES_TABLE}
+for all to service_role using (true) with check (true);
+
+revoke all on {RUN_SUMMARY_TRANSACTIONS_TABLE} from anon, authenticated;
+grant select, insert, update, delete on {RUN_SUMMARY_TRANSACTIONS_TABLE} to service_role;
+
+drop policy if exists service_role_all on {RUN_SUMMARY_TRANSACTIONS_TABLE};
+create policy service_role_all on {RUN_SUMMARY_TRANSACTIONS_TABLE}
+for all to service_role using (true) with check (true);
+"""
+
+SPLIT_EMBEDDED_TRANSACTIONS_SQL = f"""
+insert into {RUN_SUMMARY_TRANSACTIONS_TABLE} (run_id, position, tx)
+select s.run_id, t.position, t.value
+from {RUN_SUMMARIES_TABLE} s
+cross join lateral jsonb_array_elements(s.summary->'transactions') with ordinality as t(value, position)
+where s.summary ? 'transactions'
+on conflict (run_id, position) do nothing;
+
+update {RUN_SUMMARIES_TABLE}
+set summary = (summary - 'transactions')
+  || jsonb_build_object('transaction_count', jsonb_array_length(summary->'transactions'))
+where summary ? 'transactions';
+"""
+
+SAVE_RUN_SUMMARY_SQL = f"""
+insert into {RUN_SUMMARIES_TABLE} (run_id, summary, summary_hash)
+values (%s, %s, %s)
+on conflict (run_id) do nothing;
+"""
+
+GET_RUN_SUMMARY_SQL = f"""
+select summary, summary_hash
+from {RUN_SUMMARIES_TABLE}
+where run_id = %s;
+"""
+
+COUNT_RUN_SUMMARY_TRANSACTIONS_SQL = f"""
+select count(*)
+from {RUN_SUMMARY_TRANSACTIONS_TABLE}
+where run_id = %s;
+"""
+
+RUN_SUMMARY_TRANSACTIONS_SQL = f"""
+select tx
+from {RUN_SUMMARY_TRANSACTIONS_TABLE}
+where run_id = %s
+order by position;
+"""
+
+
+def save_summary_transactions_sql(select_sql):
+    return f"""
+    insert into {RUN_SUMMARY_TRANSACTIONS_TABLE} (run_id, position, tx)
+    select %(run_id)s, s.position, s.tx
+    from ({select_sql.strip().rstrip(';')}) s
+    on conflict (run_id, position) do nothing;
+    """
+
+
+def json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Unsupported summary value: {type(value).__name__}")
+
+
+def encode_summary(summary):
+    text = json.dumps(summary, default=json_default, sort_keys=True, separators=(",", ":"))
+    return json.loads(text), hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def save_run_summary(conn, run_id, summary, transactions_sql):
+    with conn.cursor() as cur:
+        cur.execute(save_summary_transactions_sql(transactions_sql), {"run_id": run_id})
+        cur.execute(COUNT_RUN_SUMMARY_TRANSACTIONS_SQL, (run_id,))
+        summary = dict(summary, transaction_count=cur.fetchone()[0])
+        summary.pop("transactions", None)
+        payload, summary_hash = encode_summary(summary)
+        cur.execute(SAVE_RUN_SUMMARY_SQL, (run_id, Jsonb(payload), summary_hash))
+    return get_run_summary(conn, run_id)
+
+
+def get_run_summary(conn, run_id):
+    with conn.cursor() as cur:
+        cur.execute(GET_RUN_SUMMARY_SQL, (run_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return {"summary": row[0], "summary_hash": row[1]}
+
+
+def get_run_summary_transactions(conn, run_id):
+    with conn.cursor() as cur:
+        cur.execute(RUN_SUMMARY_TRANSACTIONS_SQL, (run_id,))
+        return [row[0] for row in cur.fetchall()]
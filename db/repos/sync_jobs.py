@@ -0,0 +1,157 @@
+from psycopg.errors import UniqueViolation
+from config import TABLES, SYNC_JOB_MAX_ATTEMPTS
+
+SYNC_JOBS_TABLE = TABLES["sync_jobs"]
+
+
+def enqueue_item_sync(conn, plaid_item_pk, reason=None, delay_seconds=0, max_attempts=None):
+    sql = f"""
+    insert into {SYNC_JOBS_TABLE}
+      (plaid_item_pk, job_type, status, reason, max_attempts, run_after, updated_at)
+    values
+      (%s, 'item_sync', 'queued', %s, %s, now() + make_interval(secs => %s), now())
+    on conflict (plaid_item_pk) where status = 'queued' do update set
+      run_after = least({SYNC_JOBS_TABLE}.run_after, excluded.run_after),
+      reason = coalesce(excluded.reason, {SYNC_JOBS_TABLE}.reason),
+      updated_at = now()
+    returning id;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (plaid_item_pk, reason, max_attempts or SYNC_JOB_MAX_ATTEMPTS, delay_seconds))
+        return cur.fetchone()[0]
+
+
+def claim_job(conn, worker_id, lease_seconds):
+    sql = f"""
+    update {SYNC_JOBS_TABLE} j
+    set status = 'running',
+        locked_by = %s,
+        locked_at = now(),
+        attempts = j.attempts + 1,
+        updated_at = now()
+    where j.id = (
+      select c.id
+      from {SYNC_JOBS_TABLE} c
+      where (
+          (c.status = 'queued' and c.run_after <= now())
+          or (
+            c.status = 'running'
+            and c.locked_at < now() - make_interval(secs => %s)
+            and c.attempts < c.max_attempts
+          )
+        )
+        and not exists (
+          select 1
+          from {SYNC_JOBS_TABLE} r
+          where r.plaid_item_pk = c.plaid_item_pk
+            and r.id <> c.id
+            and r.status = 'running'
+            and r.locked_at >= now() - make_interval(secs => %s)
+        )
+      order by c.run_after, c.id
+      for update skip locked
+      limit 1
+    )
+    returning j.id, j.plaid_item_pk, j.reason, j.attempts, j.max_attempts;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (worker_id, lease_seconds, lease_seconds))
+        row = cur.fetchone()
+        if not row:
+            return None
+        cols = [desc[0] for desc in cur.description]
+        return dict(zip(cols, row))
+
+
+def fail_expired_jobs(conn, lease_seconds):
+    sql = f"""
+    update {SYNC_JOBS_TABLE}
+    set status = 'failed',
+        last_error = 'lease expired',
+        locked_by = null,
+        locked_at = null,
+        updated_at = now()
+    where status = 'running'
+      and locked_at < now() - make_interval(secs => %s)
+      and attempts >= max_attempts;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (lease_seconds,))
+        return cur.rowcount
+
+
+def complete_job(conn, job_id, run_id=None):
+    sql = f"""
+    update {SYNC_JOBS_TABLE}
+    set status = 'succeeded',
+        run_id = %s,
+        last_error = null,
+        locked_by = null,
+        locked_at = null,
+        updated_at = now()
+    where id = %s;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (run_id, job_id))
+        return cur.rowcount
+
+
+def fail_job(conn, job_id, error, retry_in_seconds, run_id=None):
+    sql = f"""
+    update {SYNC_JOBS_TABLE} j
+    set status = case
+          when j.attempts >= j.max_attempts then 'failed'
+          when exists (
+            select 1
+            from {SYNC_JOBS_TABLE} q
+            where q.plaid_item_pk = j.plaid_item_pk
+              and q.status = 'queued'
+          ) then 'coalesced'
+          else 'queued'
+        end,
+        run_after = now() + make_interval(secs => %s),
+        run_id = %s,
+        last_error = %s,
+        locked_by = null,
+        locked_at = null,
+        updated_at = now()
+    where j.id = %s
+    returning j.status;
+    """
+    params = (retry_in_seconds, run_id, error, job_id)
+    try:
+        with conn.transaction(), conn.cursor() as cur:
+            cur.execute(sql, params)
+            row = cur.fetchone()
+            return row[0] if row else None
+    except UniqueViolation:
+        coalesce_sql = f"""
+        update {SYNC_JOBS_TABLE}
+        set status = 'coalesced',
+            run_after = now() + make_interval(secs => %s),
+            run_id = %s,
+            last_error = %s,
+            locked_by = null,
+            locked_at = null,
+            updated_at = now()
+        where id = %s
+        returning status;
+        """
+        with conn.cursor() as cur:
+            cur.execute(coalesce_sql, params)
+            row = cur.fetchone()
+            return row[0] if row else None
+
+
+def renew_job_lease(conn, job_id, worker_id):
+    sql = f"""
+    update {SYNC_JOBS_TABLE}
+    set locked_at = now(),
+        updated_at = now()
+    where id = %s
+      and status = 'running'
+      and locked_by = %s;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (job_id, worker_id))
+        return cur.rowcount
@@ -1,9 +1,38 @@
 from datetime import date, datetime
+import hashlib
 import json
 from psycopg.types.json import Jsonb
-from config import TABLES
+from config import TABLES, DB_PARTITIONED
+from db.repos.raw_archive import raw_columns, raw_columns_many, raw_columns_many_async
 
 TRANSACTIONS_TABLE = TABLES["transactions"]
+TRANSACTIONS_STAGE_TABLE = f"{TRANSACTIONS_TABLE}_stage"
+TRANSACTIONS_BACKFILL_TABLE = TABLES["transactions_backfill"]
+
+STAGE_COLUMNS = (
+    "seq",
+    "account_pk",
+    "transaction_id",
+    "name",
+    "merchant_name",
+    "amount",
+    "iso_currency_code",
+    "date",
+    "pending",
+    "pending_transaction_id",
+    "category_id",
+    "category",
+    "personal_finance_category",
+    "payment_channel",
+    "transaction_type",
+    "authorized_date",
+    "datetime",
+    "authorized_datetime",
+    "sync_status",
+    "content_hash",
+    "raw",
+    "raw_ref",
+)
 
 
 def json_default(o):
@@ -18,7 +47,28 @@ def to_jsonb(v):
     return Jsonb(v, dumps=lambda obj: json.dumps(obj, default=json_default, separators=(",", ":")))
 
 
+def to_json_text(v):
+    if v is None:
+        return None
+    return json.dumps(v, default=json_default, separators=(",", ":"))
+
+
+def content_hash(account_pk, tx):
+    payload = json.dumps([account_pk, tx], default=json_default, separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def category_text(tx):
+    category = tx.get("category")
+    if isinstance(category, list):
+        return ", ".join(category)
+    return category
+
+
 def upsert_transaction(conn, run_id, account_pk, tx, sync_status):
+    if DB_PARTITIONED:
+        return bulk_upsert_transactions(conn, run_id, [(account_pk, tx, sync_status)])
+    raw, raw_ref = raw_columns(conn, tx)
     sql = f"""
     insert into {TRANSACTIONS_TABLE}
       (account_pk, transaction_id,
@@ -29,7 +79,7 @@ def upsert_transaction(conn, run_id, account_pk, tx, sync_status):
        authorized_date, datetime, authorized_datetime,
        sync_status, removed, removed_at,
        first_seen_run_id, last_seen_run_id,
-       raw, updated_at)
+       content_hash, raw, raw_ref, updated_at)
     values
       (%s, %s,
        %s, %s, %s, %s, %s,
@@ -39,7 +89,7 @@ def upsert_transaction(conn, run_id, account_pk, tx, sync_status):
        %s, %s, %s,
        %s, false, null,
        %s, %s,
-       %s, now())
+       %s, %s, %s, now())
     on conflict (transaction_id) do update set
       account_pk = excluded.account_pk,
       name = excluded.name,
@@ -61,8 +111,12 @@ def upsert_transaction(conn, run_id, account_pk, tx, sync_status):
       removed = false,
       removed_at = null,
       last_seen_run_id = excluded.last_seen_run_id,
+      content_hash = excluded.content_hash,
       raw = excluded.raw,
-      updated_at = now();
+      raw_ref = excluded.raw_ref,
+      updated_at = now()
+    where {TRANSACTIONS_TABLE}.content_hash is distinct from excluded.content_hash
+       or {TRANSACTIONS_TABLE}.removed;
     """
     with conn.cursor() as cur:
         cur.execute(
@@ -78,7 +132,7 @@ def upsert_transaction(conn, run_id, account_pk, tx, sync_status):
                 tx.get("pending", False),
                 tx.get("pending_transaction_id"),
                 tx.get("category_id"),
-                ", ".join(tx.get("category", [])) if isinstance(tx.get("category"), list) else tx.get("category"),
+                category_text(tx),
                 to_jsonb(tx.get("personal_finance_category")),
                 tx.get("payment_channel"),
                 tx.get("transaction_type"),
@@ -88,9 +142,265 @@ def upsert_transaction(conn, run_id, account_pk, tx, sync_status):
                 sync_status,
                 run_id,
                 run_id,
-                to_jsonb(tx),
+                content_hash(account_pk, tx),
+                to_jsonb(raw),
+                raw_ref,
             ),
         )
+        return cur.rowcount
+
+
+def stage_row(seq, account_pk, tx, sync_status, raw, raw_ref):
+    return (
+        seq,
+        account_pk,
+        tx["transaction_id"],
+        tx.get("name"),
+        tx.get("merchant_name"),
+        tx.get("amount"),
+        tx.get("iso_currency_code"),
+        tx.get("date"),
+        tx.get("pending", False),
+        tx.get("pending_transaction_id"),
+        tx.get("category_id"),
+        category_text(tx),
+        to_json_text(tx.get("personal_finance_category")),
+        tx.get("payment_channel"),
+        tx.get("transaction_type"),
+        tx.get("authorized_date"),
+        tx.get("datetime"),
+        tx.get("authorized_datetime"),
+        sync_status,
+        content_hash(account_pk, tx),
+        to_json_text(raw),
+        raw_ref,
+    )
+
+
+CREATE_STAGE_TABLE_SQL = f"""
+create temp table if not exists {TRANSACTIONS_STAGE_TABLE} (
+  seq integer not null,
+  account_pk bigint not null,
+  transaction_id text not null,
+  name text,
+  merchant_name text,
+  amount numeric,
+  iso_currency_code text,
+  date date,
+  pending boolean,
+  pending_transaction_id text,
+  category_id text,
+  category text,
+  personal_finance_category jsonb,
+  payment_channel text,
+  transaction_type text,
+  authorized_date date,
+  datetime timestamptz,
+  authorized_datetime timestamptz,
+  sync_status text not null,
+  content_hash text,
+  raw jsonb,
+  raw_ref bigint
+) on commit delete rows;
+"""
+
+
+def ensure_stage_table(cur):
+    cur.execute(CREATE_STAGE_TABLE_SQL)
+    cur.execute(f"truncate {TRANSACTIONS_STAGE_TABLE};")
+
+
+async def ensure_stage_table_async(cur):
+    await cur.execute(CREATE_STAGE_TABLE_SQL)
+    await cur.execute(f"truncate {TRANSACTIONS_STAGE_TABLE};")
+
+
+def copy_stage_sql(stage_table, columns=STAGE_COLUMNS):
+    return f"copy {stage_table} ({', '.join(columns)}) from stdin"
+
+
+def copy_stage_rows(cur, stage_table, rows, columns=STAGE_COLUMNS):
+    count = 0
+    with cur.copy(copy_stage_sql(stage_table, columns)) as copy:
+        for row in rows:
+            copy.write_row(row)
+            count += 1
+    return count
+
+
+async def copy_stage_rows_async(cur, stage_table, rows, columns=STAGE_COLUMNS):
+    count = 0
+    async with cur.copy(copy_stage_sql(stage_table, columns)) as copy:
+        for row in rows:
+            await copy.write_row(row)
+            count += 1
+    return count
+
+
+def merge_stage_partitioned_sql(stage_table, where=""):
+    return f"""
+    with src as (
+      select distinct on (s.transaction_id) s.*
+      from {stage_table} s
+      {where}
+      order by s.transaction_id, s.seq desc
+    ),
+    updated as (
+      update {TRANSACTIONS_TABLE} t set
+        account_pk = src.account_pk,
+        name = src.name,
+        merchant_name = src.merchant_name,
+        amount = src.amount,
+        iso_currency_code = src.iso_currency_code,
+        date = src.date,
+        pending = coalesce(src.pending, false),
+        pending_transaction_id = src.pending_transaction_id,
+        category_id = src.category_id,
+        category = src.category,
+        personal_finance_category = src.personal_finance_category,
+        payment_channel = src.payment_channel,
+        transaction_type = src.transaction_type,
+        authorized_date = src.authorized_date,
+        datetime = src.datetime,
+        authorized_datetime = src.authorized_datetime,
+        sync_status = src.sync_status,
+        removed = false,
+        removed_at = null,
+        last_seen_run_id = %(run_id)s,
+        content_hash = src.content_hash,
+        raw = src.raw,
+        raw_ref = src.raw_ref,
+        updated_at = now()
+      from src
+      where t.transaction_id = src.transaction_id
+        and (t.content_hash is distinct from src.content_hash or t.removed)
+      returning t.transaction_id
+    ),
+    inserted as (
+      insert into {TRANSACTIONS_TABLE}
+        (account_pk, transaction_id,
+         name, merchant_name, amount, iso_currency_code, date,
+         pending, pending_transaction_id,
+         category_id, category, personal_finance_category,
+         payment_channel, transaction_type,
+         authorized_date, datetime, authorized_datetime,
+         sync_status, removed, removed_at,
+         first_seen_run_id, last_seen_run_id,
+         content_hash, raw, raw_ref, updated_at)
+      select
+        src.account_pk, src.transaction_id,
+        src.name, src.merchant_name, src.amount, src.iso_currency_code, src.date,
+        coalesce(src.pending, false), src.pending_transaction_id,
+        src.category_id, src.category, src.personal_finance_category,
+        src.payment_channel, src.transaction_type,
+        src.authorized_date, src.datetime, src.authorized_datetime,
+        src.sync_status, false, null,
+        %(run_id)s, %(run_id)s,
+        src.content_hash, src.raw, src.raw_ref, now()
+      from src
+      where not exists (
+        select 1 from {TRANSACTIONS_TABLE} e where e.transaction_id = src.transaction_id
+      )
+      returning transaction_id
+    )
+    select (select count(*) from updated) + (select count(*) from inserted);
+    """
+
+
+def merge_stage_sql(stage_table, where=""):
+    if DB_PARTITIONED:
+        return merge_stage_partitioned_sql(stage_table, where)
+    return f"""
+    insert into {TRANSACTIONS_TABLE}
+      (account_pk, transaction_id,
+       name, merchant_name, amount, iso_currency_code, date,
+       pending, pending_transaction_id,
+       category_id, category, personal_finance_category,
+       payment_channel, transaction_type,
+       authorized_date, datetime, authorized_datetime,
+       sync_status, removed, removed_at,
+       first_seen_run_id, last_seen_run_id,
+       content_hash, raw, raw_ref, updated_at)
+    select distinct on (s.transaction_id)
+      s.account_pk, s.transaction_id,
+      s.name, s.merchant_name, s.amount, s.iso_currency_code, s.date,
+      coalesce(s.pending, false), s.pending_transaction_id,
+      s.category_id, s.category, s.personal_finance_category,
+      s.payment_channel, s.transaction_type,
+      s.authorized_date, s.datetime, s.authorized_datetime,
+      s.sync_status, false, null,
+      %(run_id)s, %(run_id)s,
+      s.content_hash, s.raw, s.raw_ref, now()
+    from {stage_table} s
+    {where}
+    order by s.transaction_id, s.seq desc
+    on conflict (transaction_id) do update set
+      account_pk = excluded.account_pk,
+      name = excluded.name,
+      merchant_name = excluded.merchant_name,
+      amount = excluded.amount,
+      iso_currency_code = excluded.iso_currency_code,
+      date = excluded.date,
+      pending = excluded.pending,
+      pending_transaction_id = excluded.pending_transaction_id,
+      category_id = excluded.category_id,
+      category = excluded.category,
+      personal_finance_category = excluded.personal_finance_category,
+      payment_channel = excluded.payment_channel,
+      transaction_type = excluded.transaction_type,
+      authorized_date = excluded.authorized_date,
+      datetime = excluded.datetime,
+      authorized_datetime = excluded.authorized_datetime,
+      sync_status = excluded.sync_status,
+      removed = false,
+      removed_at = null,
+      last_seen_run_id = excluded.last_seen_run_id,
+      content_hash = excluded.content_hash,
+      raw = excluded.raw,
+      raw_ref = excluded.raw_ref,
+      updated_at = now()
+    where {TRANSACTIONS_TABLE}.content_hash is distinct from excluded.content_hash
+       or {TRANSACTIONS_TABLE}.removed;
+    """
+
+
+def merged_count(cur):
+    return cur.fetchone()[0] if DB_PARTITIONED else cur.rowcount
+
+
+async def merged_count_async(cur):
+    return (await cur.fetchone())[0] if DB_PARTITIONED else cur.rowcount
+
+
+def stage_rows(rows, raws, start=0):
+    return (
+        stage_row(seq, account_pk, tx, sync_status, raw, raw_ref)
+        for seq, ((account_pk, tx, sync_status), (raw, raw_ref)) in enumerate(zip(rows, raws), start)
+    )
+
+
+def bulk_upsert_transactions(conn, run_id, rows):
+    rows = list(rows)
+    raws = raw_columns_many(conn, [tx for _, tx, _ in rows])
+    with conn.cursor() as cur:
+        ensure_stage_table(cur)
+        staged = copy_stage_rows(cur, TRANSACTIONS_STAGE_TABLE, stage_rows(rows, raws))
+        if not staged:
+            return 0
+        cur.execute(merge_stage_sql(TRANSACTIONS_STAGE_TABLE), {"run_id": run_id})
+        return merged_count(cur)
+
+
+async def bulk_upsert_transactions_async(conn, run_id, rows):
+    rows = list(rows)
+    raws = await raw_columns_many_async(conn, [tx for _, tx, _ in rows])
+    async with conn.cursor() as cur:
+        await ensure_stage_table_async(cur)
+        staged = await copy_stage_rows_async(cur, TRANSACTIONS_STAGE_TABLE, stage_rows(rows, raws))
+        if not staged:
+            return 0
+        await cur.execute(merge_stage_sql(TRANSACTIONS_STAGE_TABLE), {"run_id": run_id})
+        return await merged_count_async(cur)
 
 
 def mark_transaction_removed(conn, run_id, transaction_id):
@@ -105,4 +415,118 @@ def mark_transaction_removed(conn, run_id, transaction_id):
     """
     with conn.cursor() as cur:
         cur.execute(sql, (run_id, transaction_id))
-        return cur.rowcount
\ No newline at end of file
+        return cur.rowcount
+
+
+BACKFILL_COLUMNS = ("plaid_item_pk",) + STAGE_COLUMNS
+
+CLEAR_BACKFILL_SQL = f"delete from {TRANSACTIONS_BACKFILL_TABLE} where plaid_item_pk = %s;"
+
+MERGE_BACKFILL_SQL = merge_stage_sql(TRANSACTIONS_BACKFILL_TABLE, where="where s.plaid_item_pk = %(plaid_item_pk)s")
+
+
+ITEM_WRITE_LOCK_NAMESPACE = 7301
+ITEM_WRITE_LOCK_SQL = "select pg_advisory_xact_lock(%s, %s::int);"
+
+
+def lock_item_writes(conn, plaid_item_pk):
+    if not DB_PARTITIONED:
+        return
+    with conn.cursor() as cur:
+        cur.execute(ITEM_WRITE_LOCK_SQL, (ITEM_WRITE_LOCK_NAMESPACE, plaid_item_pk))
+
+
+async def lock_item_writes_async(conn, plaid_item_pk):
+    if not DB_PARTITIONED:
+        return
+    async with conn.cursor() as cur:
+        await cur.execute(ITEM_WRITE_LOCK_SQL, (ITEM_WRITE_LOCK_NAMESPACE, plaid_item_pk))
+
+
+def backfill_rows(plaid_item_pk, rows, raws, start):
+    return ((plaid_item_pk,) + row for row in stage_rows(rows, raws, start))
+
+
+def clear_backfill(conn, plaid_item_pk):
+    with conn.cursor() as cur:
+        cur.execute(CLEAR_BACKFILL_SQL, (plaid_item_pk,))
+
+
+async def clear_backfill_async(conn, plaid_item_pk):
+    async with conn.cursor() as cur:
+        await cur.execute(CLEAR_BACKFILL_SQL, (plaid_item_pk,))
+
+
+def stage_backfill_rows(conn, plaid_item_pk, rows, start=0):
+    rows = list(rows)
+    raws = raw_columns_many(conn, [tx for _, tx, _ in rows])
+    with conn.cursor() as cur:
+        return copy_stage_rows(
+            cur, TRANSACTIONS_BACKFILL_TABLE, backfill_rows(plaid_item_pk, rows, raws, start), BACKFILL_COLUMNS
+        )
+
+
+async def stage_backfill_rows_async(conn, plaid_item_pk, rows, start=0):
+    rows = list(rows)
+    raws = await raw_columns_many_async(conn, [tx for _, tx, _ in rows])
+    async with conn.cursor() as cur:
+        return await copy_stage_rows_async(
+            cur, TRANSACTIONS_BACKFILL_TABLE, backfill_rows(plaid_item_pk, rows, raws, start), BACKFILL_COLUMNS
+        )
+
+
+def merge_backfill(conn, run_id, plaid_item_pk):
+    with conn.cursor() as cur:
+        cur.execute(MERGE_BACKFILL_SQL, {"run_id": run_id, "plaid_item_pk": plaid_item_pk})
+        written = merged_count(cur)
+        cur.execute(CLEAR_BACKFILL_SQL, (plaid_item_pk,))
+        return written
+
+
+async def merge_backfill_async(conn, run_id, plaid_item_pk):
+    async with conn.cursor() as cur:
+        await cur.execute(MERGE_BACKFILL_SQL, {"run_id": run_id, "plaid_item_pk": plaid_item_pk})
+        written = await merged_count_async(cur)
+        await cur.execute(CLEAR_BACKFILL_SQL, (plaid_item_pk,))
+        return written
+
+
+MARK_TRANSACTIONS_REMOVED_SQL = f"""
+with removed as (
+  update {TRANSACTIONS_TABLE}
+  set removed = true,
+      removed_at = now(),
+      sync_status = 'removed',
+      last_seen_run_id = %s,
+      updated_at = now()
+  where transaction_id = any(%s::text[])
+  returning transaction_id
+)
+select ids.transaction_id, count(removed.transaction_id)
+from unnest(%s::text[]) as ids(transaction_id)
+left join removed
+  on removed.transaction_id = ids.transaction_id
+group by ids.transaction_id;
+"""
+
+
+def removal_ids(transaction_ids):
+    return list(dict.fromkeys(t for t in transaction_ids if t))
+
+
+def mark_transactions_removed(conn, run_id, transaction_ids):
+    ids = removal_ids(transaction_ids)
+    if not ids:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(MARK_TRANSACTIONS_REMOVED_SQL, (run_id, ids, ids))
+        return dict(cur.fetchall())
+
+
+async def mark_transactions_removed_async(conn, run_id, transaction_ids):
+    ids = removal_ids(transaction_ids)
+    if not ids:
+        return {}
+    async with conn.cursor() as cur:
+        await cur.execute(MARK_TRANSACTIONS_REMOVED_SQL, (run_id, ids, ids))
+        return dict(await cur.fetchall())
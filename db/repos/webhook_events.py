@@ -1,17 +1,25 @@
 from psycopg.types.json import Jsonb
 from config import TABLES
+from db.repos.raw_archive import raw_columns
 
 PLAID_WEBHOOK_EVENTS_TABLE = TABLES["plaid_webhook_events"]
 
+TRANSACTIONS_UPDATE_CODES = ("SYNC_UPDATES_AVAILABLE", "DEFAULT_UPDATE")
+
+
+def is_transactions_update(payload):
+    return payload.get("webhook_type") == "TRANSACTIONS" and payload.get("webhook_code") in TRANSACTIONS_UPDATE_CODES
+
 
 def insert_event(conn, payload):
     sql = f"""
     insert into {PLAID_WEBHOOK_EVENTS_TABLE}
-      (webhook_type, webhook_code, link_session_id, link_token, status, environment, raw)
+      (webhook_type, webhook_code, link_session_id, link_token, status, environment, item_id, raw, raw_ref)
     values
-      (%s, %s, %s, %s, %s, %s, %s)
+      (%s, %s, %s, %s, %s, %s, %s, %s, %s)
     returning id;
     """
+    raw, raw_ref = raw_columns(conn, payload)
     with conn.cursor() as cur:
         cur.execute(
             sql,
@@ -22,7 +30,9 @@ def insert_event(conn, payload):
                 payload.get("link_token"),
                 payload.get("status"),
                 payload.get("environment"),
-                Jsonb(payload),
+                payload.get("item_id"),
+                None if raw is None else Jsonb(raw),
+                raw_ref,
             ),
         )
         return cur.fetchone()[0]
\ No newline at end of file
@@ -28,6 +28,8 @@ create table if not exists ${RUNS_TABLE} (
   error text
 );
 
+alter table ${RUNS_TABLE} add column if not exists details jsonb;
+
 create table if not exists ${ACCOUNTS_TABLE} (
   id bigserial primary key,
   plaid_item_pk bigint not null,
@@ -113,6 +115,8 @@ create table if not exists ${TRANSACTIONS_TABLE} (
     foreign key (last_seen_run_id) references ${RUNS_TABLE}(id)
 );
 
+alter table ${TRANSACTIONS_TABLE} add column if not exists content_hash text;
+
 create table if not exists ${NOTIFICATIONS_TABLE} (
   id bigserial primary key,
   run_id bigint,
@@ -159,6 +163,89 @@ create index if not exists idx_plaid_webhook_events_link_token
 create index if not exists idx_plaid_webhook_events_received_at
   on ${PLAID_WEBHOOK_EVENTS_TABLE} (received_at);
 
+alter table ${PLAID_WEBHOOK_EVENTS_TABLE} add column if not exists item_id text;
+
+update ${PLAID_WEBHOOK_EVENTS_TABLE}
+set item_id = raw->>'item_id'
+where item_id is null
+  and raw ? 'item_id';
+
+create index if not exists idx_plaid_webhook_events_item_received_at
+  on ${PLAID_WEBHOOK_EVENTS_TABLE} (item_id, received_at);
+
+create table if not exists ${SYNC_JOBS_TABLE} (
+  id bigserial primary key,
+  plaid_item_pk bigint not null,
+  job_type text not null default 'item_sync',
+  status text not null default 'queued'
+    check (status in ('queued','running','succeeded','failed','coalesced')),
+  reason text,
+  attempts integer not null default 0,
+  max_attempts integer not null default 5,
+  run_after timestamptz not null default now(),
+  locked_by text,
+  locked_at timestamptz,
+  run_id bigint,
+  last_error text,
+  created_at timestamptz not null default now(),
+  updated_at timestamptz not null default now(),
+  constraint sync_jobs_item_fk
+    foreign key (plaid_item_pk) references ${PLAID_ITEMS_TABLE}(id) on delete cascade,
+  constraint sync_jobs_run_fk
+    foreign key (run_id) references ${RUNS_TABLE}(id) on delete set null
+);
+
+create unique index if not exists idx_sync_jobs_one_queued_per_item
+  on ${SYNC_JOBS_TABLE} (plaid_item_pk)
+  where status = 'queued';
+
+create index if not exists idx_sync_jobs_claim
+  on ${SYNC_JOBS_TABLE} (run_after, id)
+  where status in ('queued','running');
+
+create table if not exists ${RAW_ARCHIVE_TABLE} (
+  id bigserial primary key,
+  digest text not null unique,
+  codec text not null default 'zlib',
+  raw_size integer not null,
+  payload bytea not null,
+  created_at timestamptz not null default now()
+);
+
+alter table ${RAW_ARCHIVE_TABLE} alter column payload set storage external;
+
+alter table ${TRANSACTIONS_TABLE} add column if not exists raw_ref bigint references ${RAW_ARCHIVE_TABLE}(id);
+alter table ${ACCOUNTS_TABLE} add column if not exists raw_ref bigint references ${RAW_ARCHIVE_TABLE}(id);
+alter table ${BALANCE_SNAPSHOTS_TABLE} add column if not exists raw_ref bigint references ${RAW_ARCHIVE_TABLE}(id);
+alter table ${PLAID_WEBHOOK_EVENTS_TABLE} add column if not exists raw_ref bigint references ${RAW_ARCHIVE_TABLE}(id);
+alter table ${PLAID_WEBHOOK_EVENTS_TABLE} alter column raw drop not null;
+
+create unlogged table if not exists ${TRANSACTIONS_BACKFILL_TABLE} (
+  plaid_item_pk bigint not null,
+  seq integer not null,
+  account_pk bigint not null,
+  transaction_id text not null,
+  name text,
+  merchant_name text,
+  amount numeric,
+  iso_currency_code text,
+  date date,
+  pending boolean,
+  pending_transaction_id text,
+  category_id text,
+  category text,
+  personal_finance_category jsonb,
+  payment_channel text,
+  transaction_type text,
+  authorized_date date,
+  datetime timestamptz,
+  authorized_datetime timestamptz,
+  sync_status text not null,
+  content_hash text,
+  raw jsonb,
+  raw_ref bigint
+);
+
 alter table ${PLAID_ITEMS_TABLE} enable row level security;
 alter table ${ACCOUNTS_TABLE} enable row level security;
 alter table ${TRANSACTIONS_TABLE} enable row level security;
@@ -168,6 +255,9 @@ alter table ${RUNS_TABLE} enable row level security;
 alter table ${NOTIFICATIONS_TABLE} enable row level security;
 alter table ${HOSTED_LINK_SESSIONS_TABLE} enable row level security;
 alter table ${PLAID_WEBHOOK_EVENTS_TABLE} enable row level security;
+alter table ${SYNC_JOBS_TABLE} enable row level security;
+alter table ${RAW_ARCHIVE_TABLE} enable row level security;
+alter table ${TRANSACTIONS_BACKFILL_TABLE} enable row level security;
 
 revoke all on all tables in schema public from anon, authenticated;
 revoke all on all sequences in schema public from anon, authenticated;
@@ -209,4 +299,16 @@ for all to service_role using (true) with check (true);
 
 drop policy if exists service_role_all on ${PLAID_WEBHOOK_EVENTS_TABLE};
 create policy service_role_all on ${PLAID_WEBHOOK_EVENTS_TABLE}
-for all to service_role using (true) with check (true);
\ No newline at end of file
+for all to service_role using (true) with check (true);
+
+drop policy if exists service_role_all on ${SYNC_JOBS_TABLE};
+create policy service_role_all on ${SYNC_JOBS_TABLE}
+for all to service_role using (true) with check (true);
+
+drop policy if exists service_role_all on ${RAW_ARCHIVE_TABLE};
+create policy service_role_all on ${RAW_ARCHIVE_TABLE}
+for all to service_role using (true) with check (true);
+
+drop policy if exists service_role_all on ${TRANSACTIONS_BACKFILL_TABLE};
+create policy service_role_all on ${TRANSACTIONS_BACKFILL_TABLE}
+for all to service_role using (true) with check (true);
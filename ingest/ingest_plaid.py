@@ -1,14 +1,39 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date
 from db.db import db_conn
-from plaid_src.client import get_plaid_client
+from plaid_src.client import get_ingest_client
+from plaid_src.scheduler import scheduler_stats
+from notify.daily_summary import persist_run_summary
 
 from db.repos.runs import create_run, finish_run
-from db.repos.items import list_items_for_balances, list_items_for_transactions, get_access_token
-from db.repos.accounts import upsert_account, get_included_accounts
-from db.repos.balances import upsert_balance_snapshot
+from db.repos.history import record_run_history
+from db.repos.items import (
+    list_items_for_balances,
+    list_items_for_transactions,
+    list_dirty_items_for_transactions,
+    get_access_token,
+    get_ingest_access_tokens,
+)
+from db.repos.accounts import upsert_account, upsert_accounts, get_included_accounts
+from db.repos.balances import upsert_balance_snapshot, insert_balance_snapshots
 from db.repos.cursors import get_transactions_cursor, set_transactions_cursor
-from db.repos.transactions import upsert_transaction, mark_transaction_removed
-from config import TRANSACTIONS_START_DATE, PLAID_ENV
+from db.repos.transactions import (
+    upsert_transaction,
+    bulk_upsert_transactions,
+    mark_transaction_removed,
+    mark_transactions_removed,
+    clear_backfill,
+    stage_backfill_rows,
+    merge_backfill,
+    lock_item_writes,
+)
+from config import TRANSACTIONS_START_DATE, PLAID_ENV, INGEST_BULK_WRITES, INGEST_MAX_WORKERS
+from config import INGEST_PREFETCH_PAGES, INGEST_CHECKPOINT_PAGES, INGEST_BACKFILL_BULK
+from config import INGEST_TRANSACTIONS_MODE, INGEST_FULL_SWEEP_HOURS, INGEST_OVERLAP_PHASES
 
 
 def to_plain(obj):
@@ -40,121 +65,469 @@ def tx_date_ok(tx, start_date):
     return date.fromisoformat(str(d)) >= start_date
 
 
-def ingest_balances_for_item(conn, client, run_id, plaid_item_pk, label):
-    access_token = get_access_token(conn, plaid_item_pk)
-    if not access_token:
-        raise RuntimeError(f"Missing access token for plaid_item_pk={plaid_item_pk} label={label}")
-    response = to_plain(client.accounts_balance_get({"access_token": access_token})) or {}
-    accounts = response.get("accounts", []) or []
-    for account_obj in accounts:
-        account = to_plain(account_obj) or {}
-        bal = to_plain(account.get("balances")) or {}
+def account_row(account):
+    bal = to_plain(account.get("balances")) or {}
+    return {
+        "account_id": account["account_id"],
+        "name": account.get("name"),
+        "official_name": account.get("official_name"),
+        "type": account.get("type"),
+        "subtype": account.get("subtype"),
+        "mask": account.get("mask"),
+        "iso_currency_code": bal.get("iso_currency_code"),
+        "raw": account,
+    }
+
+
+def snapshot_row(account_pk, account):
+    bal = to_plain(account.get("balances")) or {}
+    return {
+        "account_pk": account_pk,
+        "current": bal.get("current"),
+        "available": bal.get("available"),
+        "credit_limit": bal.get("limit"),
+        "iso_currency_code": bal.get("iso_currency_code"),
+        "raw": bal,
+    }
+
+
+def write_balances_per_row(conn, run_id, plaid_item_pk, accounts):
+    for account in accounts:
+        row = account_row(account)
         upsert_account(
             conn=conn,
             plaid_item_pk=plaid_item_pk,
-            account_id=account["account_id"],
-            name=account.get("name"),
-            official_name=account.get("official_name"),
-            account_type=account.get("type"),
-            subtype=account.get("subtype"),
-            mask=account.get("mask"),
-            iso_currency_code=bal.get("iso_currency_code"),
-            raw=account,
+            account_id=row["account_id"],
+            name=row["name"],
+            official_name=row["official_name"],
+            account_type=row["type"],
+            subtype=row["subtype"],
+            mask=row["mask"],
+            iso_currency_code=row["iso_currency_code"],
+            raw=row["raw"],
         )
     included = get_included_accounts(conn, plaid_item_pk)
-    for account_obj in accounts:
-        account = to_plain(account_obj) or {}
+    snapshots = 0
+    for account in accounts:
         account_pk = included.get(account.get("account_id"))
         if not account_pk:
             continue
-        bal = to_plain(account.get("balances")) or {}
+        row = snapshot_row(account_pk, account)
         upsert_balance_snapshot(
             conn=conn,
             run_id=run_id,
             account_pk=account_pk,
-            current=bal.get("current"),
-            available=bal.get("available"),
-            credit_limit=bal.get("limit"),
-            iso_currency_code=bal.get("iso_currency_code"),
-            raw=bal,
+            current=row["current"],
+            available=row["available"],
+            credit_limit=row["credit_limit"],
+            iso_currency_code=row["iso_currency_code"],
+            raw=row["raw"],
         )
+        snapshots += 1
+    return snapshots
 
 
-def ingest_balances(conn, client, run_id, env):
-    items = list_items_for_balances(conn, env_override=env)
-    for plaid_item_pk, label in items:
-        ingest_balances_for_item(conn, client, run_id, plaid_item_pk, label)
+def write_balances_batched(conn, run_id, plaid_item_pk, accounts):
+    stored = upsert_accounts(conn, plaid_item_pk, [account_row(a) for a in accounts])
+    included = {
+        account_id: account_pk
+        for account_pk, account_id, include_in_app, active in stored
+        if include_in_app and active
+    }
+    snapshots = []
+    for account in accounts:
+        account_pk = included.get(account.get("account_id"))
+        if account_pk:
+            snapshots.append(snapshot_row(account_pk, account))
+    return insert_balance_snapshots(conn, run_id, snapshots)
 
 
-def ingest_transactions_sync(conn, client, run_id, plaid_item_pk, label):
-    access_token = get_access_token(conn, plaid_item_pk)
+def resolve_access_token(conn, plaid_item_pk, label, tokens=None):
+    access_token = tokens.get(plaid_item_pk) if tokens is not None else None
+    if not access_token:
+        access_token = get_access_token(conn, plaid_item_pk)
     if not access_token:
         raise RuntimeError(f"Missing access token for plaid_item_pk={plaid_item_pk} label={label}")
-    start_date = parse_start_date(TRANSACTIONS_START_DATE)
-    included = get_included_accounts(conn, plaid_item_pk)
-    cursor = get_transactions_cursor(conn, plaid_item_pk)
-    next_cursor_value = cursor
-    has_more = True
-    while has_more:
-        req = {"access_token": access_token}
-        if cursor:
-            req["cursor"] = cursor
-        resp = to_plain(client.transactions_sync(req)) or {}
-        for tx_obj in resp.get("added", []) or []:
-            tx = to_plain(tx_obj) or {}
-            account_pk = included.get(tx.get("account_id"))
-            if not account_pk:
-                continue
-            if not tx_date_ok(tx, start_date):
-                continue
-            upsert_transaction(conn, run_id, account_pk, tx, sync_status="added")
-        for tx_obj in resp.get("modified", []) or []:
+    return access_token
+
+
+@contextmanager
+def run_token_cache(conn, env):
+    tokens = get_ingest_access_tokens(conn, env_override=env)
+    try:
+        yield tokens
+    finally:
+        tokens.clear()
+
+
+def ingest_balances_for_item(conn, client, run_id, plaid_item_pk, label, tokens=None):
+    access_token = resolve_access_token(conn, plaid_item_pk, label, tokens)
+    response = to_plain(client.accounts_balance_get({"access_token": access_token})) or {}
+    accounts = [to_plain(a) or {} for a in response.get("accounts", []) or []]
+    if INGEST_BULK_WRITES:
+        snapshots = write_balances_batched(conn, run_id, plaid_item_pk, accounts)
+    else:
+        snapshots = write_balances_per_row(conn, run_id, plaid_item_pk, accounts)
+    return {"accounts": len(accounts), "snapshots": snapshots}
+
+
+def item_result(phase, plaid_item_pk, label, started, stats=None, error=None):
+    return {
+        "phase": phase,
+        "plaid_item_pk": plaid_item_pk,
+        "label": label,
+        "status": "failed" if error else "success",
+        "error": error,
+        "elapsed_ms": int((time.monotonic() - started) * 1000),
+        "stats": stats or {},
+    }
+
+
+def ingest_item(phase, fn, conn, client, run_id, plaid_item_pk, label, tokens=None):
+    started = time.monotonic()
+    stats = fn(conn, client, run_id, plaid_item_pk, label, tokens=tokens)
+    return item_result(phase, plaid_item_pk, label, started, stats=stats)
+
+
+def ingest_item_isolated(phase, fn, client, run_id, plaid_item_pk, label, tokens=None):
+    started = time.monotonic()
+    try:
+        with db_conn() as conn:
+            stats = fn(conn, client, run_id, plaid_item_pk, label, tokens=tokens)
+    except Exception as e:
+        return item_result(phase, plaid_item_pk, label, started, error=str(e))
+    return item_result(phase, plaid_item_pk, label, started, stats=stats)
+
+
+def ingest_items(phase, fn, conn, client, run_id, items, max_workers=1, tokens=None):
+    if max_workers <= 1 or len(items) <= 1:
+        return [
+            ingest_item(phase, fn, conn, client, run_id, plaid_item_pk, label, tokens=tokens)
+            for plaid_item_pk, label in items
+        ]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items)), thread_name_prefix=f"ingest-{phase}") as pool:
+        futures = [
+            pool.submit(ingest_item_isolated, phase, fn, client, run_id, plaid_item_pk, label, tokens)
+            for plaid_item_pk, label in items
+        ]
+        return [f.result() for f in futures]
+
+
+def ingest_balances(conn, client, run_id, env, max_workers=1, tokens=None):
+    items = list_items_for_balances(conn, env_override=env)
+    return ingest_items("balances", ingest_balances_for_item, conn, client, run_id, items, max_workers, tokens)
+
+
+def page_transaction_rows(resp, included, start_date):
+    rows = []
+    for sync_status in ("added", "modified"):
+        for tx_obj in resp.get(sync_status, []) or []:
             tx = to_plain(tx_obj) or {}
             account_pk = included.get(tx.get("account_id"))
             if not account_pk:
                 continue
             if not tx_date_ok(tx, start_date):
                 continue
-            upsert_transaction(conn, run_id, account_pk, tx, sync_status="modified")
-        for removed_obj in resp.get("removed", []) or []:
-            removed = to_plain(removed_obj) or {}
-            tx_id = removed.get("transaction_id")
-            if tx_id:
-                mark_transaction_removed(conn, run_id, tx_id)
+            rows.append((account_pk, tx, sync_status))
+    return rows
+
+
+def page_removed_ids(resp):
+    ids = []
+    for removed_obj in resp.get("removed", []) or []:
+        removed = to_plain(removed_obj) or {}
+        tx_id = removed.get("transaction_id")
+        if tx_id:
+            ids.append(tx_id)
+    return ids
+
+
+def fetch_sync_pages(client, access_token, cursor, plaid_item_pk, label):
+    has_more = True
+    while has_more:
+        req = {"access_token": access_token}
+        if cursor:
+            req["cursor"] = cursor
+        resp = to_plain(client.transactions_sync(req)) or {}
         next_cursor_value = resp.get("next_cursor")
         if not next_cursor_value:
             raise RuntimeError(f"transactions_sync missing next_cursor for plaid_item_pk={plaid_item_pk} label={label}")
         cursor = next_cursor_value
         has_more = bool(resp.get("has_more", False))
+        yield resp
+
+
+def prefetch(pages, depth):
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            iterator = iter(pages)
+            while not stop.is_set():
+                try:
+                    page = next(iterator)
+                except StopIteration:
+                    put(("done", None))
+                    return
+                if not put(("page", page)):
+                    return
+        except BaseException as e:
+            put(("error", e))
+
+    producer = threading.Thread(target=produce, name="transactions-sync-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            kind, value = buffer.get()
+            if kind == "error":
+                raise value
+            if kind == "done":
+                return
+            yield value
+    finally:
+        stop.set()
+        producer.join(timeout=1)
+        if producer.is_alive():
+            print(f"{producer.name}: abandoning prefetch thread still waiting on its current page")
+
+
+def new_sync_stats(backfill=False):
+    return {
+        "pages": 0,
+        "added": 0,
+        "modified": 0,
+        "skipped": 0,
+        "removed": 0,
+        "removed_missing": 0,
+        "checkpoints": 0,
+        "backfill": backfill,
+    }
+
+
+def sync_pages(client, access_token, cursor, plaid_item_pk, label):
+    pages = fetch_sync_pages(client, access_token, cursor, plaid_item_pk, label)
+    if INGEST_PREFETCH_PAGES > 0:
+        pages = prefetch(pages, INGEST_PREFETCH_PAGES)
+    return pages
+
+
+def backfill_transactions(conn, client, run_id, plaid_item_pk, label, access_token, included, start_date):
+    stats = new_sync_stats(backfill=True)
+    clear_backfill(conn, plaid_item_pk)
+    staged = 0
+    transaction_ids = set()
+    removed_ids = []
+    next_cursor_value = None
+    for resp in sync_pages(client, access_token, None, plaid_item_pk, label):
+        rows = page_transaction_rows(resp, included, start_date)
+        stats["pages"] += 1
+        for _, tx, sync_status in rows:
+            stats[sync_status] += 1
+            transaction_ids.add(tx["transaction_id"])
+        staged += stage_backfill_rows(conn, plaid_item_pk, rows, start=staged)
+        removed_ids.extend(page_removed_ids(resp))
+        next_cursor_value = resp["next_cursor"]
+    lock_item_writes(conn, plaid_item_pk)
+    written = merge_backfill(conn, run_id, plaid_item_pk)
+    stats["skipped"] += len(transaction_ids) - written
+    hits = mark_transactions_removed(conn, run_id, removed_ids)
+    stats["removed"] += len(hits)
+    stats["removed_missing"] += sum(1 for count in hits.values() if not count)
     set_transactions_cursor(conn, plaid_item_pk, next_cursor_value)
+    return stats
+
+
+def ingest_transactions_sync(conn, client, run_id, plaid_item_pk, label, tokens=None):
+    access_token = resolve_access_token(conn, plaid_item_pk, label, tokens)
+    start_date = parse_start_date(TRANSACTIONS_START_DATE)
+    included = get_included_accounts(conn, plaid_item_pk)
+    cursor = get_transactions_cursor(conn, plaid_item_pk)
+    if cursor is None and INGEST_BACKFILL_BULK and not INGEST_CHECKPOINT_PAGES:
+        return backfill_transactions(conn, client, run_id, plaid_item_pk, label, access_token, included, start_date)
+    next_cursor_value = cursor
+    stats = new_sync_stats()
+    for resp in sync_pages(client, access_token, cursor, plaid_item_pk, label):
+        rows = page_transaction_rows(resp, included, start_date)
+        stats["pages"] += 1
+        for _, _, sync_status in rows:
+            stats[sync_status] += 1
+        lock_item_writes(conn, plaid_item_pk)
+        if INGEST_BULK_WRITES:
+            written = bulk_upsert_transactions(conn, run_id, rows)
+        else:
+            written = len(
+                {
+                    tx["transaction_id"]
+                    for account_pk, tx, sync_status in rows
+                    if upsert_transaction(conn, run_id, account_pk, tx, sync_status=sync_status)
+                }
+            )
+        stats["skipped"] += len({tx["transaction_id"] for _, tx, _ in rows}) - written
+        removed_ids = page_removed_ids(resp)
+        if INGEST_BULK_WRITES:
+            hits = mark_transactions_removed(conn, run_id, removed_ids)
+        else:
+            hits = {tx_id: mark_transaction_removed(conn, run_id, tx_id) for tx_id in removed_ids}
+        stats["removed"] += len(hits)
+        stats["removed_missing"] += sum(1 for count in hits.values() if not count)
+        next_cursor_value = resp["next_cursor"]
+        if INGEST_CHECKPOINT_PAGES:
+            set_transactions_cursor(conn, plaid_item_pk, next_cursor_value)
+            conn.commit()
+            stats["checkpoints"] += 1
+    if not INGEST_CHECKPOINT_PAGES:
+        set_transactions_cursor(conn, plaid_item_pk, next_cursor_value)
+    return stats
 
 
-def ingest_transactions(conn, client, run_id, env):
-    items = list_items_for_transactions(conn, env_override=env)
-    for plaid_item_pk, label in items:
-        ingest_transactions_sync(conn, client, run_id, plaid_item_pk, label)
+def list_transactions_items(conn, env, mode):
+    if mode == "all":
+        return list_items_for_transactions(conn, env_override=env)
+    if mode == "dirty":
+        return list_dirty_items_for_transactions(conn, env_override=env, full_sweep_hours=INGEST_FULL_SWEEP_HOURS)
+    raise RuntimeError(f"Unknown transactions ingest mode: {mode}")
 
 
-def run_ingest(env=None):
+def ingest_transactions(conn, client, run_id, env, max_workers=1, tokens=None, mode="all"):
+    items = list_transactions_items(conn, env, mode)
+    return ingest_items("transactions", ingest_transactions_sync, conn, client, run_id, items, max_workers, tokens)
+
+
+def ingest_after(dependency, phase, fn, client, run_id, plaid_item_pk, label, tokens=None):
+    if dependency is not None:
+        dependency.result()
+    return ingest_item_isolated(phase, fn, client, run_id, plaid_item_pk, label, tokens)
+
+
+def ingest_phases_overlapped(conn, client, run_id, env, max_workers, tokens=None, mode="all"):
+    balance_items = list_items_for_balances(conn, env_override=env)
+    transaction_items = list_transactions_items(conn, env, mode)
+    workers = min(max_workers, len(balance_items) + len(transaction_items))
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="ingest-overlap") as pool:
+        balances = {
+            plaid_item_pk: pool.submit(
+                ingest_item_isolated, "balances", ingest_balances_for_item, client, run_id, plaid_item_pk, label, tokens
+            )
+            for plaid_item_pk, label in balance_items
+        }
+        transactions = [
+            pool.submit(
+                ingest_after,
+                balances.get(plaid_item_pk),
+                "transactions",
+                ingest_transactions_sync,
+                client,
+                run_id,
+                plaid_item_pk,
+                label,
+                tokens,
+            )
+            for plaid_item_pk, label in transaction_items
+        ]
+        return [f.result() for f in balances.values()] + [f.result() for f in transactions]
+
+
+def ingest_phases(conn, client, run_id, env, max_workers=1, tokens=None, mode="all", overlap=False):
+    if overlap and max_workers > 1:
+        return ingest_phases_overlapped(conn, client, run_id, env, max_workers, tokens=tokens, mode=mode)
+    results = ingest_balances(conn, client, run_id, env, max_workers=max_workers, tokens=tokens)
+    results += ingest_transactions(conn, client, run_id, env, max_workers=max_workers, tokens=tokens, mode=mode)
+    return results
+
+
+def run_details(results, max_workers, mode, client=None, overlap=False):
+    return {
+        "max_workers": max_workers,
+        "transactions_mode": mode,
+        "overlap_phases": overlap,
+        "plaid_calls": scheduler_stats(client),
+        "items": results,
+    }
+
+
+def failed_items_error(results):
+    failed = [r for r in results if r["status"] == "failed"]
+    if not failed:
+        return None
+    return f"{len(failed)} item(s) failed: " + "; ".join(
+        f"{r['phase']} plaid_item_pk={r['plaid_item_pk']} label={r['label']}: {r['error']}" for r in failed
+    )
+
+
+def record_history(run_id):
+    try:
+        with db_conn() as conn:
+            record_run_history(conn, run_id)
+    except Exception as e:
+        print(f"run {run_id}: balance history not recorded: {e}")
+
+
+def record_summary(run_id):
+    try:
+        persist_run_summary(run_id)
+    except Exception as e:
+        print(f"run {run_id}: summary not stored, it will be computed on first read: {e}")
+
+
+def run_ingest(env=None, max_workers=None, mode=None, overlap=None):
     env_value = env or PLAID_ENV
-    client = get_plaid_client()
+    workers = max_workers or INGEST_MAX_WORKERS
+    mode_value = mode or INGEST_TRANSACTIONS_MODE
+    overlap_value = INGEST_OVERLAP_PHASES if overlap is None else overlap
+    client = get_ingest_client()
     with db_conn() as conn:
         run_id = create_run(conn, run_type="daily_sync", env=env_value)
+    results = []
     try:
-        with db_conn() as conn:
-            ingest_balances(conn, client, run_id, env_value)
-            ingest_transactions(conn, client, run_id, env_value)
+        with db_conn() as conn, run_token_cache(conn, env_value) as tokens:
+            results.extend(
+                ingest_phases(
+                    conn,
+                    client,
+                    run_id,
+                    env_value,
+                    max_workers=workers,
+                    tokens=tokens,
+                    mode=mode_value,
+                    overlap=overlap_value,
+                )
+            )
+        error = failed_items_error(results)
+        if error:
+            raise RuntimeError(error)
     except Exception as e:
         with db_conn() as conn:
-            finish_run(conn, run_id, status="failed", error=str(e))
+            finish_run(
+                conn,
+                run_id,
+                status="failed",
+                error=str(e),
+                details=run_details(results, workers, mode_value, client, overlap_value),
+            )
         raise
     with db_conn() as conn:
-        finish_run(conn, run_id, status="success", error=None)
+        finish_run(
+            conn,
+            run_id,
+            status="success",
+            error=None,
+            details=run_details(results, workers, mode_value, client, overlap_value),
+        )
+    record_history(run_id)
+    record_summary(run_id)
     return run_id
 
 
-
-
 def main():
     run_ingest()
 
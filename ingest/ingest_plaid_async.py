@@ -0,0 +1,324 @@
+import asyncio
+import time
+from db.db import async_db_pool
+from plaid_src.async_client import AsyncRawPlaidClient
+from plaid_src.scheduler import scheduled_async_client
+
+from db.repos.runs import create_run_async, finish_run_async
+from db.repos.history import record_run_history_async
+from db.repos.items import (
+    list_items_for_balances_async,
+    list_items_for_transactions_async,
+    list_dirty_items_for_transactions_async,
+    get_ingest_access_tokens_async,
+)
+from db.repos.accounts import upsert_accounts_async, get_included_accounts_async
+from db.repos.balances import insert_balance_snapshots_async
+from db.repos.cursors import get_transactions_cursor_async, set_transactions_cursor_async
+from db.repos.transactions import (
+    bulk_upsert_transactions_async,
+    mark_transactions_removed_async,
+    clear_backfill_async,
+    stage_backfill_rows_async,
+    merge_backfill_async,
+    lock_item_writes_async,
+)
+from ingest.ingest_plaid import (
+    to_plain,
+    parse_start_date,
+    account_row,
+    snapshot_row,
+    item_result,
+    page_transaction_rows,
+    page_removed_ids,
+    new_sync_stats,
+    run_details,
+    failed_items_error,
+    record_summary,
+)
+from config import TRANSACTIONS_START_DATE, PLAID_ENV, INGEST_PREFETCH_PAGES, INGEST_CHECKPOINT_PAGES
+from config import INGEST_TRANSACTIONS_MODE, INGEST_FULL_SWEEP_HOURS, INGEST_ASYNC_CONCURRENCY
+from config import INGEST_OVERLAP_PHASES, INGEST_BACKFILL_BULK
+
+
+def resolve_access_token(plaid_item_pk, label, tokens):
+    access_token = tokens.get(plaid_item_pk)
+    if not access_token:
+        raise RuntimeError(f"Missing access token for plaid_item_pk={plaid_item_pk} label={label}")
+    return access_token
+
+
+async def write_balances_batched_async(conn, run_id, plaid_item_pk, accounts):
+    stored = await upsert_accounts_async(conn, plaid_item_pk, [account_row(a) for a in accounts])
+    included = {
+        account_id: account_pk
+        for account_pk, account_id, include_in_app, active in stored
+        if include_in_app and active
+    }
+    snapshots = []
+    for account in accounts:
+        account_pk = included.get(account.get("account_id"))
+        if account_pk:
+            snapshots.append(snapshot_row(account_pk, account))
+    return await insert_balance_snapshots_async(conn, run_id, snapshots)
+
+
+async def ingest_balances_for_item_async(pool, client, run_id, plaid_item_pk, label, tokens):
+    access_token = resolve_access_token(plaid_item_pk, label, tokens)
+    response = to_plain(await client.accounts_balance_get({"access_token": access_token})) or {}
+    accounts = [to_plain(a) or {} for a in response.get("accounts", []) or []]
+    async with pool.connection() as conn:
+        snapshots = await write_balances_batched_async(conn, run_id, plaid_item_pk, accounts)
+    return {"accounts": len(accounts), "snapshots": snapshots}
+
+
+async def fetch_sync_page(client, access_token, cursor, plaid_item_pk, label):
+    req = {"access_token": access_token}
+    if cursor:
+        req["cursor"] = cursor
+    resp = to_plain(await client.transactions_sync(req)) or {}
+    if not resp.get("next_cursor"):
+        raise RuntimeError(f"transactions_sync missing next_cursor for plaid_item_pk={plaid_item_pk} label={label}")
+    return resp
+
+
+async def sync_pages_async(client, access_token, cursor, plaid_item_pk, label):
+    pending = asyncio.create_task(fetch_sync_page(client, access_token, cursor, plaid_item_pk, label))
+    try:
+        while pending is not None:
+            resp = await pending
+            pending = None
+            if resp.get("has_more"):
+                pending = asyncio.create_task(
+                    fetch_sync_page(client, access_token, resp["next_cursor"], plaid_item_pk, label)
+                )
+            yield resp
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def backfill_transactions_async(conn, client, run_id, plaid_item_pk, label, access_token, included, start_date):
+    stats = new_sync_stats(backfill=True)
+    await clear_backfill_async(conn, plaid_item_pk)
+    staged = 0
+    transaction_ids = set()
+    removed_ids = []
+    next_cursor_value = None
+    async for resp in sync_pages_async(client, access_token, None, plaid_item_pk, label):
+        rows = page_transaction_rows(resp, included, start_date)
+        stats["pages"] += 1
+        for _, tx, sync_status in rows:
+            stats[sync_status] += 1
+            transaction_ids.add(tx["transaction_id"])
+        staged += await stage_backfill_rows_async(conn, plaid_item_pk, rows, start=staged)
+        removed_ids.extend(page_removed_ids(resp))
+        next_cursor_value = resp["next_cursor"]
+    await lock_item_writes_async(conn, plaid_item_pk)
+    written = await merge_backfill_async(conn, run_id, plaid_item_pk)
+    stats["skipped"] += len(transaction_ids) - written
+    hits = await mark_transactions_removed_async(conn, run_id, removed_ids)
+    stats["removed"] += len(hits)
+    stats["removed_missing"] += sum(1 for count in hits.values() if not count)
+    await set_transactions_cursor_async(conn, plaid_item_pk, next_cursor_value)
+    return stats
+
+
+async def ingest_transactions_sync_async(pool, client, run_id, plaid_item_pk, label, tokens):
+    access_token = resolve_access_token(plaid_item_pk, label, tokens)
+    start_date = parse_start_date(TRANSACTIONS_START_DATE)
+    stats = new_sync_stats()
+    async with pool.connection() as conn:
+        included = await get_included_accounts_async(conn, plaid_item_pk)
+        cursor = await get_transactions_cursor_async(conn, plaid_item_pk)
+        if cursor is None and INGEST_BACKFILL_BULK and not INGEST_CHECKPOINT_PAGES:
+            return await backfill_transactions_async(
+                conn, client, run_id, plaid_item_pk, label, access_token, included, start_date
+            )
+        next_cursor_value = cursor
+        pending = asyncio.create_task(fetch_sync_page(client, access_token, cursor, plaid_item_pk, label))
+        try:
+            while pending is not None:
+                resp = await pending
+                pending = None
+                if resp.get("has_more") and INGEST_PREFETCH_PAGES > 0:
+                    pending = asyncio.create_task(
+                        fetch_sync_page(client, access_token, resp["next_cursor"], plaid_item_pk, label)
+                    )
+                rows = page_transaction_rows(resp, included, start_date)
+                stats["pages"] += 1
+                for _, _, sync_status in rows:
+                    stats[sync_status] += 1
+                await lock_item_writes_async(conn, plaid_item_pk)
+                written = await bulk_upsert_transactions_async(conn, run_id, rows)
+                stats["skipped"] += len({tx["transaction_id"] for _, tx, _ in rows}) - written
+                hits = await mark_transactions_removed_async(conn, run_id, page_removed_ids(resp))
+                stats["removed"] += len(hits)
+                stats["removed_missing"] += sum(1 for count in hits.values() if not count)
+                next_cursor_value = resp["next_cursor"]
+                if INGEST_CHECKPOINT_PAGES:
+                    await set_transactions_cursor_async(conn, plaid_item_pk, next_cursor_value)
+                    await conn.commit()
+                    stats["checkpoints"] += 1
+                if resp.get("has_more") and pending is None:
+                    pending = asyncio.create_task(
+                        fetch_sync_page(client, access_token, next_cursor_value, plaid_item_pk, label)
+                    )
+        finally:
+            if pending is not None:
+                pending.cancel()
+        if not INGEST_CHECKPOINT_PAGES:
+            await set_transactions_cursor_async(conn, plaid_item_pk, next_cursor_value)
+    return stats
+
+
+async def ingest_item_async(phase, fn, pool, client, run_id, plaid_item_pk, label, tokens, semaphore, after=None):
+    if after is not None:
+        await after
+    async with semaphore:
+        started = time.monotonic()
+        try:
+            stats = await fn(pool, client, run_id, plaid_item_pk, label, tokens)
+        except Exception as e:
+            return item_result(phase, plaid_item_pk, label, started, error=str(e))
+        return item_result(phase, plaid_item_pk, label, started, stats=stats)
+
+
+async def ingest_items_async(phase, fn, pool, client, run_id, items, tokens, semaphore):
+    return await asyncio.gather(
+        *(
+            ingest_item_async(phase, fn, pool, client, run_id, plaid_item_pk, label, tokens, semaphore)
+            for plaid_item_pk, label in items
+        )
+    )
+
+
+async def list_transactions_items_async(conn, env, mode):
+    if mode == "all":
+        return await list_items_for_transactions_async(conn, env_override=env)
+    if mode == "dirty":
+        return await list_dirty_items_for_transactions_async(
+            conn, env_override=env, full_sweep_hours=INGEST_FULL_SWEEP_HOURS
+        )
+    raise RuntimeError(f"Unknown transactions ingest mode: {mode}")
+
+
+async def ingest_balances_async(pool, client, run_id, env, tokens, semaphore):
+    async with pool.connection() as conn:
+        items = await list_items_for_balances_async(conn, env_override=env)
+    return await ingest_items_async(
+        "balances", ingest_balances_for_item_async, pool, client, run_id, items, tokens, semaphore
+    )
+
+
+async def ingest_transactions_async(pool, client, run_id, env, tokens, semaphore, mode="all"):
+    async with pool.connection() as conn:
+        items = await list_transactions_items_async(conn, env, mode)
+    return await ingest_items_async(
+        "transactions", ingest_transactions_sync_async, pool, client, run_id, items, tokens, semaphore
+    )
+
+
+async def ingest_phases_overlapped_async(pool, client, run_id, env, tokens, semaphore, mode="all"):
+    async with pool.connection() as conn:
+        balance_items = await list_items_for_balances_async(conn, env_override=env)
+        transaction_items = await list_transactions_items_async(conn, env, mode)
+    balances = {
+        plaid_item_pk: asyncio.ensure_future(
+            ingest_item_async(
+                "balances",
+                ingest_balances_for_item_async,
+                pool,
+                client,
+                run_id,
+                plaid_item_pk,
+                label,
+                tokens,
+                semaphore,
+            )
+        )
+        for plaid_item_pk, label in balance_items
+    }
+    transactions = [
+        ingest_item_async(
+            "transactions",
+            ingest_transactions_sync_async,
+            pool,
+            client,
+            run_id,
+            plaid_item_pk,
+            label,
+            tokens,
+            semaphore,
+            after=balances.get(plaid_item_pk),
+        )
+        for plaid_item_pk, label in transaction_items
+    ]
+    transaction_results = await asyncio.gather(*transactions)
+    return list(await asyncio.gather(*balances.values())) + list(transaction_results)
+
+
+async def ingest_phases_async(pool, client, run_id, env, tokens, semaphore, mode="all", overlap=False):
+    if overlap:
+        return await ingest_phases_overlapped_async(pool, client, run_id, env, tokens, semaphore, mode=mode)
+    results = list(await ingest_balances_async(pool, client, run_id, env, tokens, semaphore))
+    results += await ingest_transactions_async(pool, client, run_id, env, tokens, semaphore, mode=mode)
+    return results
+
+
+def async_run_details(results, concurrency, mode, client, overlap):
+    return {**run_details(results, concurrency, mode, client, overlap), "engine": "async"}
+
+
+async def run_ingest_async(env=None, concurrency=None, mode=None, overlap=None):
+    env_value = env or PLAID_ENV
+    limit = concurrency or INGEST_ASYNC_CONCURRENCY
+    mode_value = mode or INGEST_TRANSACTIONS_MODE
+    overlap_value = INGEST_OVERLAP_PHASES if overlap is None else overlap
+    async with async_db_pool(max_size=limit + 1) as pool, AsyncRawPlaidClient(max_connections=limit) as http_client:
+        client = scheduled_async_client(http_client)
+        async with pool.connection() as conn:
+            run_id = await create_run_async(conn, run_type="daily_sync", env=env_value)
+        results = []
+        try:
+            async with pool.connection() as conn:
+                tokens = await get_ingest_access_tokens_async(conn, env_override=env_value)
+            try:
+                semaphore = asyncio.Semaphore(limit)
+                results.extend(
+                    await ingest_phases_async(
+                        pool, client, run_id, env_value, tokens, semaphore, mode=mode_value, overlap=overlap_value
+                    )
+                )
+            finally:
+                tokens.clear()
+            error = failed_items_error(results)
+            if error:
+                raise RuntimeError(error)
+        except Exception as e:
+            details = async_run_details(results, limit, mode_value, client, overlap_value)
+            async with pool.connection() as conn:
+                await finish_run_async(conn, run_id, status="failed", error=str(e), details=details)
+            raise
+        details = async_run_details(results, limit, mode_value, client, overlap_value)
+        async with pool.connection() as conn:
+            await finish_run_async(conn, run_id, status="success", error=None, details=details)
+        try:
+            async with pool.connection() as conn:
+                await record_run_history_async(conn, run_id)
+        except Exception as e:
+            print(f"run {run_id}: balance history not recorded: {e}")
+    await asyncio.to_thread(record_summary, run_id)
+    return run_id
+
+
+def run_ingest_async_blocking(env=None, concurrency=None, mode=None, overlap=None):
+    return asyncio.run(run_ingest_async(env=env, concurrency=concurrency, mode=mode, overlap=overlap))
+
+
+def main():
+    run_ingest_async_blocking()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
 from ingest.ingest_plaid import run_ingest
 from notify.send_email import send_daily_digest_email
+from config import INGEST_ASYNC, DB_PARTITIONED
+from db.db import db_conn
+from db.partitioning import maintain_partitions
 
 
 def main():
-    run_id = run_ingest()
+    if DB_PARTITIONED:
+        with db_conn() as conn:
+            maintain_partitions(conn)
+    if INGEST_ASYNC:
+        from ingest.ingest_plaid_async import run_ingest_async_blocking
+        run_id = run_ingest_async_blocking()
+    else:
+        run_id = run_ingest()
     send_daily_digest_email(run_id=run_id)
 
 
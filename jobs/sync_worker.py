@@ -0,0 +1,123 @@
+import os
+import random
+import signal
+import socket
+import threading
+from contextlib import contextmanager
+
+from config import (
+    SYNC_JOB_POLL_SECONDS,
+    SYNC_JOB_LEASE_SECONDS,
+    SYNC_JOB_BACKOFF_SECONDS,
+    SYNC_JOB_BACKOFF_MAX_SECONDS,
+)
+from db.db import db_conn
+from db.repos.items import get_item
+from db.repos.runs import create_run, finish_run
+from db.repos.sync_jobs import claim_job, complete_job, fail_job, fail_expired_jobs, renew_job_lease
+from ingest.ingest_plaid import ingest_item, ingest_balances_for_item, ingest_transactions_sync, record_history
+from plaid_src.client import get_ingest_client
+
+
+def retry_delay_seconds(attempts):
+    delay = min(SYNC_JOB_BACKOFF_MAX_SECONDS, SYNC_JOB_BACKOFF_SECONDS * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+@contextmanager
+def lease_heartbeat(job_id, worker_id, lease_seconds):
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(max(lease_seconds / 3, 1)):
+            try:
+                with db_conn() as conn:
+                    renew_job_lease(conn, job_id, worker_id)
+            except Exception as e:
+                print(f"job {job_id}: lease renewal failed: {e}")
+
+    thread = threading.Thread(target=beat, name=f"sync-job-{job_id}-lease", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def process_job(client, job):
+    plaid_item_pk = job["plaid_item_pk"]
+    with db_conn() as conn:
+        item = get_item(conn, plaid_item_pk)
+        if not item or not item["active"]:
+            return None, None
+        run_id = create_run(conn, run_type="item_sync", env=item["env"])
+    label = item["label"]
+    results = []
+    details = {"job_id": job["id"], "reason": job.get("reason"), "attempt": job["attempts"], "items": results}
+    try:
+        with db_conn() as conn:
+            if item["balances_enabled"]:
+                results.append(
+                    ingest_item("balances", ingest_balances_for_item, conn, client, run_id, plaid_item_pk, label)
+                )
+            if item["transactions_enabled"]:
+                results.append(
+                    ingest_item("transactions", ingest_transactions_sync, conn, client, run_id, plaid_item_pk, label)
+                )
+    except Exception as e:
+        with db_conn() as conn:
+            finish_run(conn, run_id, status="failed", error=str(e), details=details)
+        return run_id, str(e)
+    with db_conn() as conn:
+        finish_run(conn, run_id, status="success", error=None, details=details)
+    record_history(run_id)
+    return run_id, None
+
+
+def run_worker(worker_id=None, once=False):
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    client = get_ingest_client()
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+    signal.signal(signal.SIGINT, lambda *_: stopping.set())
+    processed = 0
+    while not stopping.is_set():
+        with db_conn() as conn:
+            expired = fail_expired_jobs(conn, SYNC_JOB_LEASE_SECONDS)
+            if expired:
+                print(f"marked {expired} job(s) failed after their lease expired on the last attempt")
+            job = claim_job(conn, worker_id, SYNC_JOB_LEASE_SECONDS)
+        if job is None:
+            if once:
+                break
+            stopping.wait(SYNC_JOB_POLL_SECONDS)
+            continue
+        try:
+            with lease_heartbeat(job["id"], worker_id, SYNC_JOB_LEASE_SECONDS):
+                run_id, error = process_job(client, job)
+        except Exception as e:
+            run_id, error = None, str(e)
+        with db_conn() as conn:
+            if error:
+                status = fail_job(
+                    conn,
+                    job["id"],
+                    error=error,
+                    retry_in_seconds=retry_delay_seconds(job["attempts"]),
+                    run_id=run_id,
+                )
+                print(f"job {job['id']} plaid_item_pk={job['plaid_item_pk']} failed ({status}): {error}")
+            else:
+                complete_job(conn, job["id"], run_id)
+        processed += 1
+    return processed
+
+
+def main():
+    processed = run_worker(once=os.getenv("SYNC_WORKER_ONCE", "false").lower() == "true")
+    print(f"Sync worker stopped. processed={processed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import argparse
+
+from db.db import db_conn
+from db.repos.rollups import find_rollup_mismatches, rebuild_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check daily_rollups against a full recompute from transactions.")
+    parser.add_argument("--limit", type=int, default=100, help="maximum mismatched (day, account) rows to print")
+    parser.add_argument("--repair", action="store_true", help="rebuild daily_rollups when mismatches are found")
+    args = parser.parse_args()
+    with db_conn() as conn:
+        mismatches = find_rollup_mismatches(conn, limit=args.limit)
+        for m in mismatches:
+            print(
+                f"{m['day']} account_pk={m['account_pk']} "
+                f"spent={m['actual_spent']} expected={m['expected_spent']} "
+                f"received={m['actual_received']} expected={m['expected_received']} "
+                f"count={m['actual_count']} expected={m['expected_count']}"
+            )
+        if not mismatches:
+            print("daily_rollups match transactions.")
+            return
+        print(f"{len(mismatches)} mismatched rollup row(s){' (limited)' if len(mismatches) == args.limit else ''}.")
+        if args.repair:
+            rows = rebuild_rollups(conn)
+            print(f"daily_rollups rebuilt: {rows} rows.")
+    if not args.repair:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
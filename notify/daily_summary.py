@@ -2,8 +2,16 @@ from datetime import datetime
 from decimal import Decimal
 from zoneinfo import ZoneInfo
 
-from config import TIMEZONE
+import psycopg
+
+from config import TIMEZONE, PDF_CHUNK_ROWS
 from db.db import db_conn
+from db.repos.summaries import (
+    get_run_summary,
+    get_run_summary_transactions,
+    save_run_summary,
+    RUN_SUMMARY_TRANSACTIONS_SQL,
+)
 from notify.queries import (
     RUN_META,
     NET_WORTH_FOR_RUN,
@@ -12,7 +20,11 @@ from notify.queries import (
     MTD_TOTALS,
     YTD_TOTALS,
     POSTED_TRANSACTIONS_FOR_RUN,
-    BALANCES_FOR_RUN,
+    POSTED_TRANSACTION_COUNT_FOR_RUN,
+    POSTED_TRANSACTIONS_SNAPSHOT_FOR_RUN,
+    BALANCES_WITH_PREV_FOR_RUN,
+    NET_WORTH_TREND,
+    ACCOUNT_BALANCE_TRENDS,
 )
 
 TZ = ZoneInfo(TIMEZONE or "America/New_York")
@@ -44,18 +56,79 @@ def fetch_all(conn, sql, params=None):
         return [dict(zip(cols, r)) for r in rows]
 
 
-def build_daily_summary_data(run_id, include_transactions=True):
+def rows_as_dicts(cur, many):
+    if cur.description is None:
+        return [] if many else {}
+    cols = [desc[0] for desc in cur.description]
+    if many:
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
+    row = cur.fetchone()
+    return {} if row is None else dict(zip(cols, row))
+
+
+def fetch_batch(conn, queries):
+    if not psycopg.Pipeline.is_supported():
+        return {
+            key: (fetch_all if many else fetch_one)(conn, sql, params)
+            for key, sql, params, many in queries
+        }
+    cursors = []
+    with conn.pipeline():
+        for key, sql, params, many in queries:
+            cur = conn.cursor()
+            cur.execute(sql, params or ())
+            cursors.append((key, cur, many))
+    results = {}
+    for key, cur, many in cursors:
+        with cur:
+            results[key] = rows_as_dicts(cur, many)
+    return results
+
+
+def summary_queries(run_id, include_transactions=True):
+    queries = [
+        ("meta", RUN_META, (run_id,), False),
+        ("today", TODAY_TOTALS_FOR_RUN, (run_id,), False),
+        ("wtd", WTD_TOTALS, None, False),
+        ("mtd", MTD_TOTALS, None, False),
+        ("ytd", YTD_TOTALS, None, False),
+        ("net", NET_WORTH_FOR_RUN, (run_id, run_id), False),
+        ("balances", BALANCES_WITH_PREV_FOR_RUN, (run_id,), True),
+        ("net_worth_trend", NET_WORTH_TREND, None, True),
+        ("account_trends", ACCOUNT_BALANCE_TRENDS, None, True),
+    ]
+    if include_transactions:
+        queries.append(("transactions", POSTED_TRANSACTIONS_FOR_RUN, (run_id,), True))
+    else:
+        queries.append(("transaction_count", POSTED_TRANSACTION_COUNT_FOR_RUN, (run_id,), False))
+    return queries
+
+
+MONEY_KEYS = (
+    "today_spent",
+    "today_received",
+    "wtd_spent",
+    "wtd_received",
+    "mtd_spent",
+    "mtd_received",
+    "ytd_spent",
+    "ytd_received",
+    "net_worth",
+)
+
+
+def compute_daily_summary(conn, run_id, include_transactions=True):
     now_local = datetime.now(TZ)
     generated_label = now_local.strftime("%Y-%m-%d %H:%M %Z")
-    with db_conn() as conn:
-        meta = fetch_one(conn, RUN_META, (run_id,))
-        today = fetch_one(conn, TODAY_TOTALS_FOR_RUN, (run_id,))
-        wtd = fetch_one(conn, WTD_TOTALS)
-        mtd = fetch_one(conn, MTD_TOTALS)
-        ytd = fetch_one(conn, YTD_TOTALS)
-        net = fetch_one(conn, NET_WORTH_FOR_RUN, (run_id,))
-        balances = fetch_all(conn, BALANCES_FOR_RUN, (run_id,))
-        txs = fetch_all(conn, POSTED_TRANSACTIONS_FOR_RUN, (run_id,)) if include_transactions else []
+    results = fetch_batch(conn, summary_queries(run_id, include_transactions))
+    meta = results["meta"]
+    today = results["today"]
+    wtd = results["wtd"]
+    mtd = results["mtd"]
+    ytd = results["ytd"]
+    net = results["net"]
+    txs = results.get("transactions", [])
+    tx_count = len(txs) if include_transactions else results["transaction_count"].get("transaction_count", 0)
     return {
         "run_id": run_id,
         "generated_label": generated_label,
@@ -69,6 +142,67 @@ def build_daily_summary_data(run_id, include_transactions=True):
         "ytd_spent": to_decimal(ytd.get("ytd_spent")),
         "ytd_received": to_decimal(ytd.get("ytd_received")),
         "net_worth": to_decimal(net.get("net_worth")),
-        "balances": balances,
+        "balances": results["balances"],
+        "net_worth_trend": results["net_worth_trend"],
+        "account_trends": results["account_trends"],
         "transactions": txs,
-    }
\ No newline at end of file
+        "transaction_count": tx_count,
+    }
+
+
+def decode_summary(stored, transactions=None):
+    d = dict(stored["summary"])
+    for key in MONEY_KEYS:
+        d[key] = to_decimal(d.get(key))
+    d["summary_hash"] = stored["summary_hash"]
+    d["transactions"] = transactions or []
+    return d
+
+
+def run_finished(d):
+    return d["run_status"] in ("success", "failed")
+
+
+def store_run_summary(conn, run_id):
+    stored = get_run_summary(conn, run_id)
+    if stored is None:
+        d = compute_daily_summary(conn, run_id, include_transactions=False)
+        stored = save_run_summary(conn, run_id, d, POSTED_TRANSACTIONS_SNAPSHOT_FOR_RUN)
+    return decode_summary(stored)
+
+
+def persist_run_summary(run_id):
+    with db_conn() as conn:
+        return store_run_summary(conn, run_id)
+
+
+def build_daily_summary_data(run_id, include_transactions=True):
+    with db_conn() as conn:
+        stored = get_run_summary(conn, run_id)
+        if stored is None:
+            d = compute_daily_summary(conn, run_id, include_transactions=False)
+            if not run_finished(d):
+                if include_transactions:
+                    d["transactions"] = fetch_all(conn, POSTED_TRANSACTIONS_FOR_RUN, (run_id,))
+                    d["transaction_count"] = len(d["transactions"])
+                return d
+            stored = save_run_summary(conn, run_id, d, POSTED_TRANSACTIONS_SNAPSHOT_FOR_RUN)
+        transactions = get_run_summary_transactions(conn, run_id) if include_transactions else None
+    return decode_summary(stored, transactions)
+
+
+def iter_run_transactions(run_id, from_summary=True, batch_size=PDF_CHUNK_ROWS):
+    with db_conn() as conn:
+        with conn.cursor(name=f"run_{run_id}_transactions") as cur:
+            cur.itersize = max(batch_size, 1) * 10
+            if from_summary:
+                cur.execute(RUN_SUMMARY_TRANSACTIONS_SQL, (run_id,))
+                for row in cur:
+                    yield row[0]
+                return
+            cur.execute(POSTED_TRANSACTIONS_FOR_RUN, (run_id,))
+            cols = None
+            for row in cur:
+                if cols is None:
+                    cols = [desc[0] for desc in cur.description]
+                yield dict(zip(cols, row))
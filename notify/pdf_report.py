@@ -1,3 +1,6 @@
+import hashlib
+import time
+from functools import lru_cache
 from io import BytesIO
 from decimal import Decimal
 
@@ -7,7 +10,24 @@ from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, KeepTogether
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 
-from notify.daily_summary import build_daily_summary_data
+from config import PDF_CACHE_ENABLED, PDF_CACHE_MAX_BYTES, PDF_LARGE_REPORT_ROWS, PDF_CHUNK_ROWS
+from db.db import db_conn
+from db.repos.pdf_cache import get_cached_pdf, put_cached_pdf
+from notify.daily_summary import build_daily_summary_data, iter_run_transactions
+
+PDF_LAYOUT_VERSION = "2"
+
+TX_HEADER = ["date", "item", "account", "name", "spent", "received", "net"]
+TX_COL_WIDTHS = [
+    0.75 * inch,
+    0.95 * inch,
+    1.20 * inch,
+    2.15 * inch,
+    0.75 * inch,
+    0.75 * inch,
+    0.75 * inch,
+]
+TX_NUMERIC_COLS = frozenset({4, 5, 6})
 
 
 def to_decimal(x):
@@ -41,14 +61,13 @@ def truncate(s, n):
     return s[: n - 1] + "…"
 
 
-def make_table(data, col_widths, numeric_cols=None):
-    if numeric_cols is None:
-        numeric_cols = set()
-    t = Table(data, colWidths=col_widths, repeatRows=1, hAlign="LEFT")
+@lru_cache(maxsize=None)
+def table_style(ncols, numeric_cols):
     style_cmds = [
         ("FONTNAME", (0, 0), (-1, -1), "Courier"),
         ("FONTSIZE", (0, 0), (-1, -1), 8.0),
         ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#E9ECEF")),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#F7F7F7")]),
         ("GRID", (0, 0), (-1, -1), 0.6, colors.HexColor("#333333")),
         ("BOX", (0, 0), (-1, -1), 0.8, colors.HexColor("#333333")),
         ("LEFTPADDING", (0, 0), (-1, -1), 2),
@@ -57,16 +76,18 @@ def make_table(data, col_widths, numeric_cols=None):
         ("BOTTOMPADDING", (0, 0), (-1, -1), 1),
         ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
     ]
-    for col in range(len(data[0])):
+    for col in range(ncols):
         style_cmds.append(("ALIGN", (col, 0), (col, 0), "CENTER"))
         if col in numeric_cols:
             style_cmds.append(("ALIGN", (col, 1), (col, -1), "RIGHT"))
         else:
             style_cmds.append(("ALIGN", (col, 1), (col, -1), "LEFT"))
-    for r in range(1, len(data)):
-        if r % 2 == 0:
-            style_cmds.append(("BACKGROUND", (0, r), (-1, r), colors.HexColor("#F7F7F7")))
-    t.setStyle(TableStyle(style_cmds))
+    return TableStyle(style_cmds)
+
+
+def make_table(data, col_widths, numeric_cols=None):
+    t = Table(data, colWidths=col_widths, repeatRows=1, hAlign="LEFT")
+    t.setStyle(table_style(len(data[0]), frozenset(numeric_cols or ())))
     return t
 
 
@@ -82,7 +103,7 @@ def make_balances_table(rows):
                 truncate(name, 28),
                 truncate(r.get("account_type"), 10),
                 truncate(r.get("account_subtype"), 12),
-                net_plain(r.get("signed_current")),
+                net_plain(r.get("current_signed")),
             ]
         )
     t = make_table(
@@ -107,8 +128,107 @@ def make_balances_table(rows):
     return t
 
 
+def optional_net(x):
+    return "" if x is None else net_plain(x)
+
+
+def make_trend_tables(net_worth_trend, account_trends):
+    nw_tbl = [["period", "net_worth", "then", "change"]]
+    for r in net_worth_trend:
+        nw_tbl.append(
+            [
+                r.get("period"),
+                net_plain(r.get("current_net_worth")),
+                optional_net(r.get("past_net_worth")),
+                optional_net(r.get("delta")),
+            ]
+        )
+    acct_tbl = [["account", "balance", "30d", "90d", "365d"]]
+    for r in account_trends:
+        acct_tbl.append(
+            [
+                truncate(r.get("account_name"), 28),
+                net_plain(r.get("current_signed")),
+                optional_net(r.get("delta_30d")),
+                optional_net(r.get("delta_90d")),
+                optional_net(r.get("delta_365d")),
+            ]
+        )
+    return (
+        make_table(
+            nw_tbl,
+            col_widths=[1.25 * inch, 1.45 * inch, 1.45 * inch, 1.45 * inch],
+            numeric_cols={1, 2, 3},
+        ),
+        make_table(
+            acct_tbl,
+            col_widths=[2.65 * inch, 1.20 * inch, 1.05 * inch, 1.05 * inch, 1.05 * inch],
+            numeric_cols={1, 2, 3, 4},
+        ),
+    )
+
+
+def tx_cells(tx):
+    amt = to_decimal(tx.get("amount"))
+    spent = amt if amt > 0 else Decimal("0")
+    received = -amt if amt < 0 else Decimal("0")
+    net = received - spent
+    return [
+        truncate(tx.get("date"), 10),
+        truncate(tx.get("item_label"), 10),
+        truncate(tx.get("account_name"), 14),
+        truncate(tx.get("merchant_name") or tx.get("name"), 24),
+        money_plain(spent) if spent else "",
+        money_plain(received) if received else "",
+        net_plain(net),
+    ]
+
+
+def transaction_tables(txs, chunk_rows):
+    chunk = [TX_HEADER]
+    for tx in txs:
+        chunk.append(tx_cells(tx))
+        if len(chunk) > chunk_rows:
+            yield make_table(chunk, TX_COL_WIDTHS, TX_NUMERIC_COLS)
+            chunk = [TX_HEADER]
+    if len(chunk) > 1:
+        yield make_table(chunk, TX_COL_WIDTHS, TX_NUMERIC_COLS)
+
+
+def summary_pdf_inputs(run_id):
+    d = build_daily_summary_data(run_id, include_transactions=False)
+    return d, iter_run_transactions(run_id, from_summary=bool(d.get("summary_hash")))
+
+
 def build_daily_summary_pdf(run_id):
-    d = build_daily_summary_data(run_id)
+    return render_daily_summary_pdf(*summary_pdf_inputs(run_id))
+
+
+def pdf_content_hash(summary_hash):
+    return hashlib.sha256(f"{PDF_LAYOUT_VERSION}:{summary_hash}".encode("utf-8")).hexdigest()
+
+
+def cached_daily_summary_pdf(run_id):
+    d, transactions = summary_pdf_inputs(run_id)
+    summary_hash = d.get("summary_hash")
+    if not PDF_CACHE_ENABLED or not summary_hash:
+        started = time.monotonic()
+        pdf_bytes = render_daily_summary_pdf(d, transactions)
+        return pdf_bytes, {"cache": "bypass", "render_ms": int((time.monotonic() - started) * 1000)}
+    content_hash = pdf_content_hash(summary_hash)
+    with db_conn() as conn:
+        pdf_bytes = get_cached_pdf(conn, run_id, content_hash)
+    if pdf_bytes is not None:
+        return pdf_bytes, {"cache": "hit", "render_ms": 0}
+    started = time.monotonic()
+    pdf_bytes = render_daily_summary_pdf(d, transactions)
+    render_ms = int((time.monotonic() - started) * 1000)
+    with db_conn() as conn:
+        evicted = put_cached_pdf(conn, run_id, content_hash, pdf_bytes, render_ms, PDF_CACHE_MAX_BYTES)
+    return pdf_bytes, {"cache": "miss", "render_ms": render_ms, "evicted": evicted}
+
+
+def render_daily_summary_pdf(d, transactions=None, large=None):
     today_spent = to_decimal(d.get("today_spent"))
     today_received = to_decimal(d.get("today_received"))
     today_net = today_received - today_spent
@@ -122,7 +242,15 @@ def build_daily_summary_pdf(run_id):
     ytd_received = to_decimal(d.get("ytd_received"))
     ytd_net = ytd_received - ytd_spent
     balances = d.get("balances") or []
-    txs = d.get("transactions") or []
+    net_worth_trend = d.get("net_worth_trend") or []
+    account_trends = d.get("account_trends") or []
+    txs = (d.get("transactions") or []) if transactions is None else transactions
+    tx_count = d.get("transaction_count")
+    if transactions is None or tx_count is None or tx_count <= PDF_LARGE_REPORT_ROWS:
+        txs = list(txs)
+        tx_count = len(txs)
+    if large is None:
+        large = tx_count > PDF_LARGE_REPORT_ROWS
     buf = BytesIO()
     doc = SimpleDocTemplate(
         buf,
@@ -195,43 +323,23 @@ def build_daily_summary_pdf(run_id):
     else:
         story.append(KeepTogether(make_balances_table(balances)))
     story.append(Spacer(1, 14))
+    if net_worth_trend:
+        nw_table, acct_table = make_trend_tables(net_worth_trend, account_trends)
+        story.append(Paragraph("net_worth_trend", mono_bold))
+        story.append(Spacer(1, 4))
+        story.append(KeepTogether(nw_table))
+        if account_trends:
+            story.append(Spacer(1, 8))
+            story.append(KeepTogether(acct_table))
+        story.append(Spacer(1, 14))
     story.append(Paragraph("transactions_delta", mono_bold))
     story.append(Spacer(1, 4))
-    if not txs:
+    if tx_count == 0:
         story.append(Paragraph("No posted transactions for this run.", mono))
+    elif large:
+        story.extend(transaction_tables(txs, PDF_CHUNK_ROWS))
     else:
-        tx_tbl = [["date", "item", "account", "name", "spent", "received", "net"]]
-        for tx in txs:
-            amt = to_decimal(tx.get("amount"))
-            spent = amt if amt > 0 else Decimal("0")
-            received = -amt if amt < 0 else Decimal("0")
-            net = received - spent
-            tx_tbl.append(
-                [
-                    truncate(tx.get("date"), 10),
-                    truncate(tx.get("item_label"), 10),
-                    truncate(tx.get("account_name"), 14),
-                    truncate(tx.get("merchant_name") or tx.get("name"), 24),
-                    money_plain(spent) if spent else "",
-                    money_plain(received) if received else "",
-                    net_plain(net),
-                ]
-            )
-        story.append(
-            make_table(
-                tx_tbl,
-                col_widths=[
-                    0.75 * inch,
-                    0.95 * inch,
-                    1.20 * inch,
-                    2.15 * inch,
-                    0.75 * inch,
-                    0.75 * inch,
-                    0.75 * inch,
-                ],
-                numeric_cols={4, 5, 6},
-            )
-        )
+        story.append(make_table([TX_HEADER] + [tx_cells(tx) for tx in txs], TX_COL_WIDTHS, TX_NUMERIC_COLS))
     doc.build(story)
     pdf_bytes = buf.getvalue()
     buf.close()
@@ -5,6 +5,9 @@ PLAID_ITEMS_TABLE = TABLES["plaid_items"]
 ACCOUNTS_TABLE = TABLES["accounts"]
 BALANCE_SNAPSHOTS_TABLE = TABLES["balance_snapshots"]
 TRANSACTIONS_TABLE = TABLES["transactions"]
+DAILY_ROLLUPS_TABLE = TABLES["daily_rollups"]
+BALANCE_HISTORY_TABLE = TABLES["balance_history"]
+NET_WORTH_HISTORY_TABLE = TABLES["net_worth_history"]
 
 SQL_TZ = TIMEZONE or "America/New_York"
 
@@ -25,13 +28,13 @@ where id = %s;
 
 BALANCES_WITH_PREV_FOR_RUN = f"""
 with current_run as (
-  select id, env
-  from runs
+  select id, env, started_at
+  from {RUNS_TABLE}
   where id = %s
 ),
 prior_run as (
-  select r.id as prior_run_id
-  from runs r
+  select r.id as prior_run_id, r.started_at as prior_started_at
+  from {RUNS_TABLE} r
   join current_run cr on cr.env = r.env
   where r.run_type = 'daily_sync'
     and r.status = 'success'
@@ -49,12 +52,13 @@ current_per_account as (
       when a.type in ('credit', 'loan') then -abs(coalesce(bs.current, 0))
       else coalesce(bs.current, 0)
     end as current_signed
-  from balance_snapshots bs
-  join accounts a
+  from {BALANCE_SNAPSHOTS_TABLE} bs
+  join {ACCOUNTS_TABLE} a
     on a.id = bs.account_pk
   join current_run cr
     on true
   where bs.run_id = cr.id
+    and bs.snapshot_at >= (select started_at from current_run)
     and a.include_in_app = true
     and a.active = true
 ),
@@ -65,12 +69,13 @@ prior_per_account as (
       when a.type in ('credit', 'loan') then -abs(coalesce(bs.current, 0))
       else coalesce(bs.current, 0)
     end as prior_signed
-  from balance_snapshots bs
-  join accounts a
+  from {BALANCE_SNAPSHOTS_TABLE} bs
+  join {ACCOUNTS_TABLE} a
     on a.id = bs.account_pk
   join prior_run pr
     on pr.prior_run_id = bs.run_id
-  where a.include_in_app = true
+  where bs.snapshot_at >= (select prior_started_at from prior_run)
+    and a.include_in_app = true
     and a.active = true
 ),
 joined as (
@@ -150,6 +155,7 @@ from {BALANCE_SNAPSHOTS_TABLE} bs
 join {ACCOUNTS_TABLE} a
   on a.id = bs.account_pk
 where bs.run_id = %s
+  and bs.snapshot_at >= (select started_at from {RUNS_TABLE} where id = %s)
   and a.include_in_app = true
   and a.active = true;
 """
@@ -194,10 +200,8 @@ order by t.date desc, t.amount desc;
 """
 
 
-WTD_TOTALS = f"""
-select
-  coalesce(sum(case when t.amount > 0 then t.amount else 0 end), 0) as wtd_spent,
-  coalesce(sum(case when t.amount < 0 then -t.amount else 0 end), 0) as wtd_received
+POSTED_TRANSACTION_COUNT_FOR_RUN = f"""
+select count(*) as transaction_count
 from {TRANSACTIONS_TABLE} t
 join {ACCOUNTS_TABLE} a
   on a.id = t.account_pk
@@ -205,38 +209,150 @@ where a.include_in_app = true
   and a.active = true
   and t.removed = false
   and coalesce(t.pending, false) = false
-  and t.date >= date_trunc('week', (now() at time zone '{SQL_TZ}'))::date
-  and t.date <= (now() at time zone '{SQL_TZ}')::date;
+  and t.last_seen_run_id = %s;
 """
 
 
-MTD_TOTALS = f"""
+POSTED_TRANSACTIONS_SNAPSHOT_FOR_RUN = f"""
 select
-  coalesce(sum(case when t.amount > 0 then t.amount else 0 end), 0) as mtd_spent,
-  coalesce(sum(case when t.amount < 0 then -t.amount else 0 end), 0) as mtd_received
+  row_number() over (order by t.date desc, t.amount desc, t.id) as position,
+  jsonb_build_object(
+    'date', t.date,
+    'name', t.name,
+    'merchant_name', t.merchant_name,
+    'amount', t.amount::text,
+    'account_id', a.account_id,
+    'account_name', a.name,
+    'item_label', pi.label,
+    'sync_status', t.sync_status
+  ) as tx
 from {TRANSACTIONS_TABLE} t
 join {ACCOUNTS_TABLE} a
   on a.id = t.account_pk
+join {PLAID_ITEMS_TABLE} pi
+  on pi.id = a.plaid_item_pk
 where a.include_in_app = true
   and a.active = true
   and t.removed = false
   and coalesce(t.pending, false) = false
-  and t.date >= date_trunc('month', (now() at time zone '{SQL_TZ}'))::date
-  and t.date <= (now() at time zone '{SQL_TZ}')::date;
+  and t.last_seen_run_id = %(run_id)s;
+"""
+
+
+WTD_TOTALS = f"""
+select
+  coalesce(sum(r.spent), 0) as wtd_spent,
+  coalesce(sum(r.received), 0) as wtd_received
+from {DAILY_ROLLUPS_TABLE} r
+join {ACCOUNTS_TABLE} a
+  on a.id = r.account_pk
+where a.include_in_app = true
+  and a.active = true
+  and r.day >= date_trunc('week', (now() at time zone '{SQL_TZ}'))::date
+  and r.day <= (now() at time zone '{SQL_TZ}')::date;
+"""
+
+
+MTD_TOTALS = f"""
+select
+  coalesce(sum(r.spent), 0) as mtd_spent,
+  coalesce(sum(r.received), 0) as mtd_received
+from {DAILY_ROLLUPS_TABLE} r
+join {ACCOUNTS_TABLE} a
+  on a.id = r.account_pk
+where a.include_in_app = true
+  and a.active = true
+  and r.day >= date_trunc('month', (now() at time zone '{SQL_TZ}'))::date
+  and r.day <= (now() at time zone '{SQL_TZ}')::date;
 """
 
 
 YTD_TOTALS = f"""
 select
-  coalesce(sum(case when t.amount > 0 then t.amount else 0 end), 0) as ytd_spent,
-  coalesce(sum(case when t.amount < 0 then -t.amount else 0 end), 0) as ytd_received
-from {TRANSACTIONS_TABLE} t
+  coalesce(sum(r.spent), 0) as ytd_spent,
+  coalesce(sum(r.received), 0) as ytd_received
+from {DAILY_ROLLUPS_TABLE} r
 join {ACCOUNTS_TABLE} a
-  on a.id = t.account_pk
+  on a.id = r.account_pk
 where a.include_in_app = true
   and a.active = true
-  and t.removed = false
-  and coalesce(t.pending, false) = false
-  and t.date >= date_trunc('year', (now() at time zone '{SQL_TZ}'))::date
-  and t.date <= (now() at time zone '{SQL_TZ}')::date;
-"""
\ No newline at end of file
+  and r.day >= date_trunc('year', (now() at time zone '{SQL_TZ}'))::date
+  and r.day <= (now() at time zone '{SQL_TZ}')::date;
+"""
+
+
+NET_WORTH_SERIES = f"""
+select
+  day,
+  net_worth
+from {NET_WORTH_HISTORY_TABLE}
+where day >= (now() at time zone '{SQL_TZ}')::date - %s
+order by day;
+"""
+
+
+NET_WORTH_TREND = f"""
+with latest as (
+  select day, net_worth
+  from {NET_WORTH_HISTORY_TABLE}
+  order by day desc
+  limit 1
+)
+select
+  p.period,
+  l.net_worth as current_net_worth,
+  past.net_worth as past_net_worth,
+  l.net_worth - past.net_worth as delta
+from (values ('30d', 30), ('90d', 90), ('365d', 365)) p(period, days)
+cross join latest l
+left join lateral (
+  select n.net_worth
+  from {NET_WORTH_HISTORY_TABLE} n
+  where n.day <= l.day - p.days
+  order by n.day desc
+  limit 1
+) past on true
+order by p.days;
+"""
+
+
+ACCOUNT_BALANCE_TRENDS = f"""
+with latest as (
+  select distinct on (h.account_pk)
+    h.account_pk,
+    h.day,
+    h.current_signed
+  from {BALANCE_HISTORY_TABLE} h
+  join {ACCOUNTS_TABLE} a
+    on a.id = h.account_pk
+  where a.include_in_app = true
+    and a.active = true
+  order by h.account_pk, h.day desc
+)
+select
+  coalesce(nullif(a.official_name, ''), nullif(a.name, ''), a.account_id) as account_name,
+  a.type as account_type,
+  l.current_signed,
+  l.current_signed - d30.current_signed as delta_30d,
+  l.current_signed - d90.current_signed as delta_90d,
+  l.current_signed - d365.current_signed as delta_365d
+from latest l
+join {ACCOUNTS_TABLE} a
+  on a.id = l.account_pk
+left join lateral (
+  select h.current_signed from {BALANCE_HISTORY_TABLE} h
+  where h.account_pk = l.account_pk and h.day <= l.day - 30
+  order by h.day desc limit 1
+) d30 on true
+left join lateral (
+  select h.current_signed from {BALANCE_HISTORY_TABLE} h
+  where h.account_pk = l.account_pk and h.day <= l.day - 90
+  order by h.day desc limit 1
+) d90 on true
+left join lateral (
+  select h.current_signed from {BALANCE_HISTORY_TABLE} h
+  where h.account_pk = l.account_pk and h.day <= l.day - 365
+  order by h.day desc limit 1
+) d365 on true
+order by a.type nulls last, account_name;
+"""
@@ -8,7 +8,7 @@ from dotenv import load_dotenv
 from config import TIMEZONE, NOTIFICATIONS_ENABLED
 from db.db import db_conn
 from db.repos.notifications import upsert_notification
-from notify.pdf_report import build_daily_summary_pdf
+from notify.pdf_report import cached_daily_summary_pdf
 
 load_dotenv()
 
@@ -54,7 +54,7 @@ def send_daily_digest_email(run_id, subject=None):
             error=None,
         )
     try:
-        pdf_bytes = build_daily_summary_pdf(run_id)
+        pdf_bytes, pdf_info = cached_daily_summary_pdf(run_id)
     except Exception as e:
         err = str(e)
         with db_conn() as conn:
@@ -90,7 +90,10 @@ def send_daily_digest_email(run_id, subject=None):
                 run_id=run_id,
                 channel=channel,
                 status="success",
-                message=f"to={to_addr} subject={subject}",
+                message=(
+                    f"to={to_addr} subject={subject} "
+                    f"pdf_cache={pdf_info['cache']} render_ms={pdf_info['render_ms']}"
+                ),
                 error=None,
             )
         return {"subject": subject, "to": to_addr}
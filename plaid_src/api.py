@@ -11,7 +11,9 @@ from db.repos.hosted_link_sessions import (
     mark_success,
     mark_failed,
 )
-from db.repos.webhook_events import insert_event
+from db.repos.webhook_events import insert_event, is_transactions_update
+from db.repos.items import get_plaid_item_pk_by_item_id
+from db.repos.sync_jobs import enqueue_item_sync
 from config import PLAID_REDIRECT_URI
 import copy
 
@@ -95,10 +97,14 @@ def create_app():
     def plaid_webhook():
         payload = request.get_json(force=True) or {}
         redacted_payload = redact_plaid_payload(payload)
-        with db_conn() as conn:
-            insert_event(conn, redacted_payload)
         webhook_type = payload.get("webhook_type")
         webhook_code = payload.get("webhook_code")
+        with db_conn() as conn:
+            insert_event(conn, redacted_payload)
+            if is_transactions_update(payload):
+                plaid_item_pk = get_plaid_item_pk_by_item_id(conn, payload.get("item_id"))
+                job_id = enqueue_item_sync(conn, plaid_item_pk, reason=webhook_code) if plaid_item_pk else None
+                return jsonify({"ok": True, "logged": True, "handled": job_id is not None, "job_id": job_id})
         if webhook_type == "LINK" and webhook_code == "EVENTS":
             return jsonify({"ok": True, "logged": True, "handled": False})
         if webhook_type == "LINK" and webhook_code == "SESSION_FINISHED":
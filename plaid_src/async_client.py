@@ -0,0 +1,50 @@
+import json
+import httpx
+from config import PLAID_CLIENT_ID, PLAID_SECRET, PLAID_HOST, PLAID_HTTP_POOL_SIZE, PLAID_HTTP_TIMEOUT_SECONDS
+from plaid_src.raw_client import PLAID_API_VERSION, to_body, api_exception
+
+
+class AsyncRawPlaidClient:
+    def __init__(
+        self,
+        host=PLAID_HOST,
+        client_id=PLAID_CLIENT_ID,
+        secret=PLAID_SECRET,
+        max_connections=PLAID_HTTP_POOL_SIZE,
+    ):
+        self.host = host.rstrip("/")
+        self.client_id = client_id
+        self.secret = secret
+        self.http = httpx.AsyncClient(
+            base_url=self.host,
+            timeout=PLAID_HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers={"Content-Type": "application/json", "Plaid-Version": PLAID_API_VERSION},
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        await self.http.aclose()
+
+    async def request(self, path, req):
+        body = to_body(req)
+        body["client_id"] = self.client_id
+        body["secret"] = self.secret
+        resp = await self.http.post(path, content=json.dumps(body, separators=(",", ":")).encode("utf-8"))
+        if resp.status_code >= 400:
+            raise api_exception(resp.status_code, resp.reason_phrase, resp.content, resp.headers)
+        return resp.content
+
+    async def post(self, path, req):
+        return json.loads(await self.request(path, req))
+
+    async def transactions_sync(self, req):
+        return await self.post("/transactions/sync", req)
+
+    async def accounts_balance_get(self, req):
+        return await self.post("/accounts/balance/get", req)
@@ -1,7 +1,7 @@
 from plaid.configuration import Configuration
 from plaid.api_client import ApiClient
 from plaid.api.plaid_api import PlaidApi
-from config import PLAID_CLIENT_ID, PLAID_SECRET, PLAID_HOST
+from config import PLAID_CLIENT_ID, PLAID_SECRET, PLAID_HOST, PLAID_RAW_CLIENT
 
 def get_plaid_client():
     config = Configuration(
@@ -11,4 +11,12 @@ def get_plaid_client():
             "secret": PLAID_SECRET,
         },
     )
-    return PlaidApi(ApiClient(config))
\ No newline at end of file
+    return PlaidApi(ApiClient(config))
+
+
+def get_ingest_client():
+    from plaid_src.scheduler import scheduled_client
+    if PLAID_RAW_CLIENT:
+        from plaid_src.raw_client import RawPlaidClient
+        return scheduled_client(RawPlaidClient())
+    return scheduled_client(get_plaid_client())
\ No newline at end of file
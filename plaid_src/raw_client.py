@@ -0,0 +1,56 @@
+import json
+import urllib3
+from plaid import ApiException
+from config import PLAID_CLIENT_ID, PLAID_SECRET, PLAID_HOST, PLAID_HTTP_POOL_SIZE, PLAID_HTTP_TIMEOUT_SECONDS
+
+PLAID_API_VERSION = "2020-09-14"
+
+
+def to_body(req):
+    if isinstance(req, dict):
+        return dict(req)
+    if hasattr(req, "to_dict") and callable(getattr(req, "to_dict")):
+        return req.to_dict()
+    raise TypeError(f"Unsupported Plaid request type: {type(req).__name__}")
+
+
+def api_exception(status, reason, body, headers):
+    e = ApiException(status=status, reason=reason)
+    e.body = body.decode("utf-8", errors="replace") if isinstance(body, bytes) else body
+    e.headers = headers
+    return e
+
+
+class RawPlaidClient:
+    def __init__(self, host=PLAID_HOST, client_id=PLAID_CLIENT_ID, secret=PLAID_SECRET):
+        self.host = host.rstrip("/")
+        self.client_id = client_id
+        self.secret = secret
+        self.http = urllib3.PoolManager(
+            maxsize=PLAID_HTTP_POOL_SIZE,
+            timeout=urllib3.Timeout(total=PLAID_HTTP_TIMEOUT_SECONDS),
+            retries=False,
+        )
+
+    def request(self, path, req):
+        body = to_body(req)
+        body["client_id"] = self.client_id
+        body["secret"] = self.secret
+        resp = self.http.request(
+            "POST",
+            f"{self.host}{path}",
+            body=json.dumps(body, separators=(",", ":")).encode("utf-8"),
+            headers={"Content-Type": "application/json", "Plaid-Version": PLAID_API_VERSION},
+        )
+        if resp.status >= 400:
+            raise api_exception(resp.status, resp.reason, resp.data, resp.headers)
+        return resp.data
+
+    def post(self, path, req):
+        return json.loads(self.request(path, req))
+
+    def transactions_sync(self, req):
+        return self.post("/transactions/sync", req)
+
+    def accounts_balance_get(self, req):
+        return self.post("/accounts/balance/get", req)
@@ -0,0 +1,294 @@
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib3
+from plaid import ApiException
+from config import (
+    PLAID_SCHEDULER_ENABLED,
+    PLAID_SYNC_CLIENT_PER_MINUTE,
+    PLAID_SYNC_ITEM_PER_MINUTE,
+    PLAID_BALANCE_CLIENT_PER_MINUTE,
+    PLAID_BALANCE_ITEM_PER_MINUTE,
+    PLAID_RETRY_MAX_ATTEMPTS,
+    PLAID_RETRY_BASE_SECONDS,
+    PLAID_RETRY_MAX_SECONDS,
+    PLAID_RETRY_BUDGET_RATIO,
+    PLAID_RETRY_BUDGET_MIN,
+)
+
+SYNC_ENDPOINT = "/transactions/sync"
+BALANCE_ENDPOINT = "/accounts/balance/get"
+
+RETRYABLE_ERROR_TYPES = {"RATE_LIMIT_EXCEEDED", "API_ERROR"}
+RETRYABLE_ERROR_CODES = {
+    "RATE_LIMIT_EXCEEDED",
+    "INTERNAL_SERVER_ERROR",
+    "PLANNED_MAINTENANCE",
+    "INSTITUTION_NOT_RESPONDING",
+}
+
+
+def transport_errors():
+    errors = [ConnectionError, TimeoutError, urllib3.exceptions.HTTPError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+TRANSPORT_ERRORS = transport_errors()
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, per_minute, floor_ratio=0.1):
+        self.ceiling = per_minute / 60.0
+        self.rate = self.ceiling
+        self.floor = self.ceiling * floor_ratio
+        self.capacity = max(1.0, per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        with self.lock:
+            self.refill(time.monotonic())
+            self.tokens -= 1.0
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def throttled(self):
+        with self.lock:
+            self.rate = max(self.floor, self.rate / 2.0)
+            self.tokens = min(self.tokens, 0.0)
+
+    def succeeded(self):
+        with self.lock:
+            self.rate = min(self.ceiling, self.rate + self.ceiling * 0.05)
+
+
+class RetryBudget:
+    def __init__(self, ratio, minimum):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.calls = 0
+        self.retries = 0
+        self.lock = threading.Lock()
+
+    def record_call(self):
+        with self.lock:
+            self.calls += 1
+
+    def spend(self):
+        with self.lock:
+            if self.retries >= self.minimum + self.ratio * self.calls:
+                return False
+            self.retries += 1
+            return True
+
+
+def item_key(req):
+    access_token = req.get("access_token") if isinstance(req, dict) else getattr(req, "access_token", None)
+    if not access_token:
+        return None
+    return hashlib.sha256(str(access_token).encode("utf-8")).hexdigest()[:16]
+
+
+def error_fields(e):
+    try:
+        body = json.loads(e.body) if e.body else {}
+    except (TypeError, ValueError):
+        body = {}
+    return body.get("error_type"), body.get("error_code")
+
+
+def retry_after_seconds(e):
+    headers = getattr(e, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+def classify(e):
+    if isinstance(e, ApiException):
+        error_type, error_code = error_fields(e)
+        throttled = e.status == 429 or error_type == "RATE_LIMIT_EXCEEDED" or error_code == "RATE_LIMIT_EXCEEDED"
+        retryable = (
+            throttled
+            or (e.status or 0) >= 500
+            or error_type in RETRYABLE_ERROR_TYPES
+            or error_code in RETRYABLE_ERROR_CODES
+        )
+        return retryable, throttled
+    if isinstance(e, TRANSPORT_ERRORS):
+        return True, False
+    return False, False
+
+
+class CallScheduler:
+    def __init__(
+        self,
+        limits=None,
+        max_attempts=PLAID_RETRY_MAX_ATTEMPTS,
+        base_seconds=PLAID_RETRY_BASE_SECONDS,
+        max_seconds=PLAID_RETRY_MAX_SECONDS,
+        budget=None,
+    ):
+        self.limits = limits or {
+            SYNC_ENDPOINT: (PLAID_SYNC_CLIENT_PER_MINUTE, PLAID_SYNC_ITEM_PER_MINUTE),
+            BALANCE_ENDPOINT: (PLAID_BALANCE_CLIENT_PER_MINUTE, PLAID_BALANCE_ITEM_PER_MINUTE),
+        }
+        self.max_attempts = max(1, max_attempts)
+        self.base_seconds = base_seconds
+        self.max_seconds = max_seconds
+        self.budget = budget or RetryBudget(PLAID_RETRY_BUDGET_RATIO, PLAID_RETRY_BUDGET_MIN)
+        self.buckets = {}
+        self.lock = threading.Lock()
+        self.counters = {"calls": 0, "retries": 0, "throttled": 0, "budget_exhausted": 0, "wait_ms": 0}
+
+    def bucket(self, endpoint, key):
+        with self.lock:
+            bucket = self.buckets.get((endpoint, key))
+            if bucket is None:
+                client_limit, item_limit = self.limits[endpoint]
+                bucket = TokenBucket(client_limit if key is None else item_limit)
+                self.buckets[(endpoint, key)] = bucket
+            return bucket
+
+    def buckets_for(self, endpoint, key):
+        if endpoint not in self.limits:
+            return []
+        buckets = [self.bucket(endpoint, None)]
+        if key is not None:
+            buckets.append(self.bucket(endpoint, key))
+        return buckets
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def reserve(self, buckets):
+        delay = max([b.reserve() for b in buckets] or [0.0])
+        if delay > 0:
+            self.count("wait_ms", int(delay * 1000))
+        return delay
+
+    def backoff(self, attempt, e):
+        delay = random.uniform(0, min(self.max_seconds, self.base_seconds * (2 ** attempt)))
+        retry_after = retry_after_seconds(e)
+        if retry_after is not None:
+            delay = max(delay, min(self.max_seconds, retry_after))
+        return delay
+
+    def on_success(self, buckets):
+        for b in buckets:
+            b.succeeded()
+
+    def on_failure(self, buckets, attempt, e):
+        retryable, throttled = classify(e)
+        if throttled:
+            self.count("throttled")
+            for b in buckets:
+                b.throttled()
+        if not retryable or attempt + 1 >= self.max_attempts:
+            return None
+        if not self.budget.spend():
+            self.count("budget_exhausted")
+            return None
+        self.count("retries")
+        return self.backoff(attempt, e)
+
+    def call(self, endpoint, fn, req):
+        buckets = self.buckets_for(endpoint, item_key(req))
+        self.budget.record_call()
+        for attempt in range(self.max_attempts):
+            time.sleep(self.reserve(buckets))
+            self.count("calls")
+            try:
+                result = fn(req)
+            except Exception as e:
+                delay = self.on_failure(buckets, attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            self.on_success(buckets)
+            return result
+
+    async def call_async(self, endpoint, fn, req):
+        buckets = self.buckets_for(endpoint, item_key(req))
+        self.budget.record_call()
+        for attempt in range(self.max_attempts):
+            await asyncio.sleep(self.reserve(buckets))
+            self.count("calls")
+            try:
+                result = await fn(req)
+            except Exception as e:
+                delay = self.on_failure(buckets, attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self.on_success(buckets)
+            return result
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = CallScheduler()
+    return _scheduler
+
+
+class ScheduledPlaidClient:
+    def __init__(self, client, scheduler=None):
+        self.client = client
+        self.scheduler = scheduler or get_scheduler()
+
+    def transactions_sync(self, req):
+        return self.scheduler.call(SYNC_ENDPOINT, self.client.transactions_sync, req)
+
+    def accounts_balance_get(self, req):
+        return self.scheduler.call(BALANCE_ENDPOINT, self.client.accounts_balance_get, req)
+
+
+class AsyncScheduledPlaidClient:
+    def __init__(self, client, scheduler=None):
+        self.client = client
+        self.scheduler = scheduler or get_scheduler()
+
+    async def transactions_sync(self, req):
+        return await self.scheduler.call_async(SYNC_ENDPOINT, self.client.transactions_sync, req)
+
+    async def accounts_balance_get(self, req):
+        return await self.scheduler.call_async(BALANCE_ENDPOINT, self.client.accounts_balance_get, req)
+
+
+def scheduled_client(client):
+    return ScheduledPlaidClient(client) if PLAID_SCHEDULER_ENABLED else client
+
+
+def scheduled_async_client(client):
+    return AsyncScheduledPlaidClient(client) if PLAID_SCHEDULER_ENABLED else client
+
+
+def scheduler_stats(client):
+    scheduler = getattr(client, "scheduler", None)
+    return scheduler.stats() if scheduler is not None else None